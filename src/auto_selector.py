@@ -55,7 +55,7 @@ class AutoSelector:
         
         return 'unknown', []
 
-    def find_and_click_answers(self, ai_response: str, screenshot_region: Optional[Tuple[int, int, int, int]] = None):
+    def find_and_click_answers(self, ai_response: str, screenshot_region: Optional[Tuple[int, int, int, int]] = None, ocr_result=None):
         if not self.enabled:
             log_info("Auto-selector is disabled, skipping automatic selection")
             return
@@ -76,7 +76,7 @@ class AutoSelector:
             clicked_positions = []
             for idx, answer in enumerate(answers, 1):
                 log_info(f"Attempting to select answer {idx}/{len(answers)}: '{answer}'")
-                clicked_pos = self._click_answer_on_screen(answer, screenshot_region, clicked_positions)
+                clicked_pos = self._click_answer_on_screen(answer, screenshot_region, clicked_positions, ocr_result)
                 if clicked_pos:
                     clicked_positions.append(clicked_pos)
                     log_info(f"Successfully clicked answer {idx}/{len(answers)} at position {clicked_pos}")
@@ -92,7 +92,79 @@ class AutoSelector:
             log_error(f"Error during auto-selection: {e}", exc_info=True)
 
 
-    def _click_answer_on_screen(self, answer_text: str, region: Optional[Tuple[int, int, int, int]] = None, clicked_positions: List[Tuple[int, int]] = None):
+    def _find_best_match(self, ocr_data: dict, clean_answer: str) -> Tuple[Optional[int], float]:
+        best_match = None
+        best_match_score = 0
+        
+        answer_words = clean_answer.lower().split()
+        answer_lower = clean_answer.lower()
+        answer_no_spaces = answer_lower.replace(' ', '')
+        
+        for i in range(len(ocr_data['text'])):
+            if not ocr_data['text'][i].strip():
+                continue
+            
+            window_texts = []
+            window_indices = []
+            for j in range(max(0, i-2), min(len(ocr_data['text']), i+10)):
+                if ocr_data['text'][j].strip():
+                    window_texts.append(ocr_data['text'][j].strip())
+                    window_indices.append(j)
+            
+            window_text = ' '.join(window_texts).lower()
+            window_text_no_spaces = window_text.replace(' ', '')
+            
+            if len(answer_words) == 1:
+                for idx, word in enumerate(window_texts):
+                    if word.lower() == answer_lower:
+                        best_match = window_indices[idx]
+                        best_match_score = 100
+                        break
+            
+            if answer_lower in window_text:
+                exact_match_pos = window_text.find(answer_lower)
+                if exact_match_pos != -1:
+                    words_before = window_text[:exact_match_pos].split()
+                    target_word_idx = len(words_before)
+                    if target_word_idx < len(window_indices):
+                        score = 95
+                        if score > best_match_score:
+                            best_match = window_indices[min(target_word_idx, len(window_indices)-1)]
+                            best_match_score = score
+            
+            if best_match_score < 95 and len(answer_no_spaces) > 5:
+                if answer_no_spaces in window_text_no_spaces:
+                    score = 90
+                    if score > best_match_score:
+                        best_match = window_indices[0]
+                        best_match_score = score
+            
+            if best_match_score < 90 and len(answer_lower) > 5:
+                for j in range(len(window_texts)):
+                    window_chunk = ' '.join(window_texts[j:min(j+len(answer_words)+2, len(window_texts))]).lower()
+                    if len(window_chunk) > 0:
+                        common_chars = sum(1 for c in answer_lower if c in window_chunk)
+                        similarity = common_chars / len(answer_lower)
+                        
+                        if similarity > 0.85:  
+                            score = int(similarity * 85)
+                            if score > best_match_score:
+                                best_match = window_indices[j]
+                                best_match_score = score
+            
+            if best_match_score < 90:
+                matched_words = sum(1 for word in answer_words if len(word) > 2 and word in window_text)
+                total_important_words = sum(1 for word in answer_words if len(word) > 2)
+                
+                if total_important_words > 0 and matched_words >= max(2, int(total_important_words * 0.7)):
+                    score = (matched_words / max(len(answer_words), 1)) * 85
+                    if score > best_match_score:
+                        best_match = window_indices[0]
+                        best_match_score = score
+        
+        return best_match, best_match_score
+
+    def _click_answer_on_screen(self, answer_text: str, region: Optional[Tuple[int, int, int, int]] = None, clicked_positions: List[Tuple[int, int]] = None, ocr_result=None):
         try:
             clean_answer = re.sub(r'^[_©•Oo\-\*\s]+', '', answer_text).strip()
             clean_answer = re.sub(r'^\(e\)\s*', '', clean_answer, flags=re.IGNORECASE)
@@ -100,80 +172,20 @@ class AutoSelector:
             
             log_info(f"Searching for answer on screen: '{clean_answer}'")
             
-            screenshot = ImageGrab.grab(all_screens=True)
-            
+            best_match, best_match_score = None, 0
+            ocr_data = None
+            if ocr_result is not None and len(ocr_result) and region:
+                ocr_data = ocr_result.to_data((region[0], region[1]))
+                best_match, best_match_score = self._find_best_match(ocr_data, clean_answer)
+                if best_match is not None and best_match_score > 50:
+                    log_info("Located answer in the capture's OCR result")
+
             try:
-                ocr_data = pytesseract.image_to_data(screenshot, output_type=pytesseract.Output.DICT)
-                
-                best_match = None
-                best_match_score = 0
-                
-                answer_words = clean_answer.lower().split()
-                answer_lower = clean_answer.lower()
-                answer_no_spaces = answer_lower.replace(' ', '')
-                
-                for i in range(len(ocr_data['text'])):
-                    if not ocr_data['text'][i].strip():
-                        continue
-                    
-                    window_texts = []
-                    window_indices = []
-                    for j in range(max(0, i-2), min(len(ocr_data['text']), i+10)):
-                        if ocr_data['text'][j].strip():
-                            window_texts.append(ocr_data['text'][j].strip())
-                            window_indices.append(j)
-                    
-                    window_text = ' '.join(window_texts).lower()
-                    window_text_no_spaces = window_text.replace(' ', '')
-                    
-                    if len(answer_words) == 1:
-                        for idx, word in enumerate(window_texts):
-                            if word.lower() == answer_lower:
-                                best_match = window_indices[idx]
-                                best_match_score = 100
-                                break
-                    
-                    if answer_lower in window_text:
-                        exact_match_pos = window_text.find(answer_lower)
-                        if exact_match_pos != -1:
-                            words_before = window_text[:exact_match_pos].split()
-                            target_word_idx = len(words_before)
-                            if target_word_idx < len(window_indices):
-                                score = 95
-                                if score > best_match_score:
-                                    best_match = window_indices[min(target_word_idx, len(window_indices)-1)]
-                                    best_match_score = score
-                    
-                    if best_match_score < 95 and len(answer_no_spaces) > 5:
-                        if answer_no_spaces in window_text_no_spaces:
-                            score = 90
-                            if score > best_match_score:
-                                best_match = window_indices[0]
-                                best_match_score = score
-                    
-                    if best_match_score < 90 and len(answer_lower) > 5:
-                        for j in range(len(window_texts)):
-                            window_chunk = ' '.join(window_texts[j:min(j+len(answer_words)+2, len(window_texts))]).lower()
-                            if len(window_chunk) > 0:
-                                common_chars = sum(1 for c in answer_lower if c in window_chunk)
-                                similarity = common_chars / len(answer_lower)
-                                
-                                if similarity > 0.85:  
-                                    score = int(similarity * 85)
-                                    if score > best_match_score:
-                                        best_match = window_indices[j]
-                                        best_match_score = score
-                    
-                    if best_match_score < 90:
-                        matched_words = sum(1 for word in answer_words if len(word) > 2 and word in window_text)
-                        total_important_words = sum(1 for word in answer_words if len(word) > 2)
-                        
-                        if total_important_words > 0 and matched_words >= max(2, int(total_important_words * 0.7)):
-                            score = (matched_words / max(len(answer_words), 1)) * 85
-                            if score > best_match_score:
-                                best_match = window_indices[0]
-                                best_match_score = score
-                
+                if best_match is None or best_match_score <= 50:
+                    screenshot = ImageGrab.grab(all_screens=True)
+                    ocr_data = pytesseract.image_to_data(screenshot, output_type=pytesseract.Output.DICT)
+                    best_match, best_match_score = self._find_best_match(ocr_data, clean_answer)
+
                 if best_match is not None and best_match_score > 50:
                     x = ocr_data['left'][best_match]
                     y = ocr_data['top'][best_match] + ocr_data['height'][best_match] // 2
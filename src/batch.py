@@ -0,0 +1,189 @@
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+from PIL import Image
+
+from .config_manager import config
+from .ocr_engines import image_to_text
+from .ollama_integration import get_ai_response
+from .utils import log_info, log_error, log_warning
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.webp'}
+
+
+def find_images(input_dir: Path) -> list:
+    return sorted(
+        path for path in input_dir.rglob('*')
+        if path.is_file() and path.suffix.lower() in IMAGE_EXTENSIONS
+    )
+
+
+def _read_records(output_file: Path) -> dict:
+    """Last record per file; a later line for the same file replaces an earlier one."""
+    records = {}
+    if not output_file.exists():
+        return records
+
+    with open(output_file, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                log_warning(f"Skipping malformed line {line_number} in {output_file}")
+                continue
+            if record.get('file'):
+                records[record['file']] = record
+    return records
+
+
+def load_completed(output_file: Path) -> set:
+    return {name for name, record in _read_records(output_file).items() if not record.get('error')}
+
+
+def compact_results(output_file: Path) -> set:
+    """Rewrite the results with one successful record per file, dropping failures that will be retried."""
+    if not output_file.exists():
+        return set()
+    completed = [record for record in _read_records(output_file).values() if not record.get('error')]
+
+    temp_file = output_file.with_suffix(output_file.suffix + '.tmp')
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        for record in completed:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    os.replace(temp_file, output_file)
+    return {record['file'] for record in completed}
+
+
+def _ocr_worker(image_path: str) -> tuple:
+    start = time.perf_counter()
+    with Image.open(image_path) as image:
+        text = image_to_text(image.convert('RGB'))
+    return text, time.perf_counter() - start
+
+
+class JsonlWriter:
+    def __init__(self, output_file: Path):
+        self.output_file = output_file
+        self.lock = threading.Lock()
+        self.output_file.parent.mkdir(parents=True, exist_ok=True)
+        self.handle = open(output_file, 'a', encoding='utf-8')
+
+    def write(self, record: dict):
+        with self.lock:
+            self.handle.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self.handle.flush()
+
+    def close(self):
+        with self.lock:
+            self.handle.close()
+
+
+def _answer_and_record(writer: JsonlWriter, record: dict) -> dict:
+    start = time.perf_counter()
+    try:
+        answer = get_ai_response(record['ocr_text'])
+        record['answer'] = answer
+        if answer.startswith("Error:"):
+            record['error'] = answer
+    except Exception as e:
+        log_error(f"Batch model error for {record['file']}: {e}", exc_info=True)
+        record['error'] = str(e)
+    record['model_seconds'] = round(time.perf_counter() - start, 3)
+    writer.write(record)
+    return record
+
+
+def run_batch(input_dir: Path, output_file: Path, ocr_workers: int, model_concurrency: int, resume: bool = True) -> dict:
+    images = find_images(input_dir)
+    completed = compact_results(output_file) if resume else set()
+    pending = [path for path in images if path.relative_to(input_dir).as_posix() not in completed]
+
+    log_info(f"Batch: {len(images)} images found, {len(images) - len(pending)} already done, {len(pending)} to process")
+    print(f"Found {len(images)} images, {len(pending)} to process ({len(images) - len(pending)} already done)")
+
+    stats = {'processed': 0, 'failed': 0, 'skipped': len(images) - len(pending)}
+    if not pending:
+        return stats
+
+    if not resume and output_file.exists():
+        output_file.unlink()
+
+    writer = JsonlWriter(output_file)
+    model_futures = []
+
+    try:
+        with ProcessPoolExecutor(max_workers=ocr_workers) as ocr_pool, \
+                ThreadPoolExecutor(max_workers=model_concurrency) as model_pool:
+            ocr_futures = {ocr_pool.submit(_ocr_worker, str(path)): path for path in pending}
+
+            for future in as_completed(ocr_futures):
+                path = ocr_futures[future]
+                record = {'file': path.relative_to(input_dir).as_posix()}
+                try:
+                    text, ocr_seconds = future.result()
+                except Exception as e:
+                    log_error(f"Batch OCR error for {record['file']}: {e}")
+                    record['error'] = f"OCR failed: {e}"
+                    writer.write(record)
+                    stats['failed'] += 1
+                    continue
+
+                record['ocr_text'] = text
+                record['ocr_seconds'] = round(ocr_seconds, 3)
+                model_futures.append(model_pool.submit(_answer_and_record, writer, record))
+
+            for future in as_completed(model_futures):
+                record = future.result()
+                if record.get('error'):
+                    stats['failed'] += 1
+                    print(f"  [FAILED] {record['file']}: {record['error']}")
+                else:
+                    stats['processed'] += 1
+                    print(f"  [OK] {record['file']}")
+    finally:
+        writer.close()
+
+    log_info(f"Batch finished: {stats}")
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run OCR and AI answering over a folder of images.")
+    parser.add_argument('input_dir', help="Folder containing question images")
+    parser.add_argument('-o', '--output', default=None,
+                        help="JSONL results file (default: <input_dir>/results.jsonl)")
+    parser.add_argument('--ocr-workers', type=int, default=config.get('batch_ocr_workers', 4),
+                        help="Number of OCR worker processes")
+    parser.add_argument('--model-concurrency', type=int, default=config.get('batch_model_concurrency', 2),
+                        help="Maximum concurrent AI requests")
+    parser.add_argument('--no-resume', action='store_true',
+                        help="Start over instead of skipping images already in the output file")
+    args = parser.parse_args(argv)
+
+    input_dir = Path(args.input_dir).resolve()
+    if not input_dir.is_dir():
+        parser.error(f"Not a directory: {input_dir}")
+
+    output_file = Path(args.output) if args.output else input_dir / 'results.jsonl'
+
+    stats = run_batch(
+        input_dir,
+        output_file,
+        ocr_workers=max(1, args.ocr_workers),
+        model_concurrency=max(1, args.model_concurrency),
+        resume=not args.no_resume
+    )
+    print(f"Done: {stats['processed']} processed, {stats['failed']} failed, {stats['skipped']} skipped")
+    print(f"Results: {output_file}")
+    return 0 if stats['failed'] == 0 else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,375 @@
+import ctypes
+import ctypes.util
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+import cv2
+from PIL import Image, ImageGrab
+import pyautogui
+
+from .config_manager import config
+from .utils import log_error, log_warning
+
+
+class CaptureBackend:
+    name = "base"
+
+    def is_available(self) -> bool:
+        return True
+
+    def grab(self, region: tuple, grayscale: bool = False):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    @staticmethod
+    def _to_gray(image: Image.Image) -> np.ndarray:
+        return np.asarray(image.convert('L'))
+
+
+class PILCaptureBackend(CaptureBackend):
+    name = "pil"
+
+    def grab(self, region: tuple, grayscale: bool = False):
+        x, y, w, h = region
+        image = ImageGrab.grab(bbox=(x, y, x + w, y + h), all_screens=True)
+        return self._to_gray(image) if grayscale else image
+
+
+class PyAutoGUICaptureBackend(CaptureBackend):
+    name = "pyautogui"
+
+    def grab(self, region: tuple, grayscale: bool = False):
+        image = pyautogui.screenshot(region=region)
+        return self._to_gray(image) if grayscale else image
+
+
+class _XShmSegmentInfo(ctypes.Structure):
+    _fields_ = [
+        ("shmseg", ctypes.c_ulong),
+        ("shmid", ctypes.c_int),
+        ("shmaddr", ctypes.c_void_p),
+        ("readOnly", ctypes.c_int),
+    ]
+
+
+class _XImage(ctypes.Structure):
+    _fields_ = [
+        ("width", ctypes.c_int),
+        ("height", ctypes.c_int),
+        ("xoffset", ctypes.c_int),
+        ("format", ctypes.c_int),
+        ("data", ctypes.c_void_p),
+        ("byte_order", ctypes.c_int),
+        ("bitmap_unit", ctypes.c_int),
+        ("bitmap_bit_order", ctypes.c_int),
+        ("bitmap_pad", ctypes.c_int),
+        ("depth", ctypes.c_int),
+        ("bytes_per_line", ctypes.c_int),
+        ("bits_per_pixel", ctypes.c_int),
+    ]
+
+
+_X_ERROR_HANDLER = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p)
+
+
+class X11ShmCaptureBackend(CaptureBackend):
+    name = "x11shm"
+
+    _Z_PIXMAP = 2
+    _ALL_PLANES = 0xFFFFFFFF
+    _IPC_PRIVATE = 0
+    _IPC_CREAT = 0o1000
+    _IPC_RMID = 0
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.display = None
+        self.ximage = None
+        self.shminfo = None
+        self.segment_size = (0, 0)
+        self.x_error = False
+        self._error_handler = _X_ERROR_HANDLER(self._on_x_error)
+        self._available = self._load()
+
+    def _on_x_error(self, display, event):
+        self.x_error = True
+        return 0
+
+    def _load(self) -> bool:
+        if not sys.platform.startswith('linux') or not os.environ.get('DISPLAY'):
+            return False
+
+        x11_path = ctypes.util.find_library('X11')
+        xext_path = ctypes.util.find_library('Xext')
+        libc_path = ctypes.util.find_library('c')
+        if not all([x11_path, xext_path, libc_path]):
+            return False
+
+        try:
+            self.xlib = ctypes.CDLL(x11_path)
+            self.xext = ctypes.CDLL(xext_path)
+            self.libc = ctypes.CDLL(libc_path, use_errno=True)
+        except OSError as e:
+            log_warning(f"X11 shared-memory capture unavailable: {e}")
+            return False
+
+        self.xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        self.xlib.XOpenDisplay.restype = ctypes.c_void_p
+        self.xlib.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        self.xlib.XDefaultScreen.argtypes = [ctypes.c_void_p]
+        self.xlib.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+        self.xlib.XDefaultRootWindow.restype = ctypes.c_ulong
+        self.xlib.XDefaultVisual.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        self.xlib.XDefaultVisual.restype = ctypes.c_void_p
+        self.xlib.XDefaultDepth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        self.xlib.XDisplayWidth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        self.xlib.XDisplayHeight.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        self.xlib.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        self.xlib.XSetErrorHandler.argtypes = [_X_ERROR_HANDLER]
+        self.xlib.XSetErrorHandler.restype = _X_ERROR_HANDLER
+        self.xlib.XDestroyImage.argtypes = [ctypes.POINTER(_XImage)]
+
+        self.xext.XShmQueryExtension.argtypes = [ctypes.c_void_p]
+        self.xext.XShmCreateImage.argtypes = [
+            ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int, ctypes.c_char_p,
+            ctypes.POINTER(_XShmSegmentInfo), ctypes.c_uint, ctypes.c_uint
+        ]
+        self.xext.XShmCreateImage.restype = ctypes.POINTER(_XImage)
+        self.xext.XShmAttach.argtypes = [ctypes.c_void_p, ctypes.POINTER(_XShmSegmentInfo)]
+        self.xext.XShmDetach.argtypes = [ctypes.c_void_p, ctypes.POINTER(_XShmSegmentInfo)]
+        self.xext.XShmGetImage.argtypes = [
+            ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(_XImage), ctypes.c_int, ctypes.c_int, ctypes.c_ulong
+        ]
+
+        self.libc.shmget.argtypes = [ctypes.c_int, ctypes.c_size_t, ctypes.c_int]
+        self.libc.shmat.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int]
+        self.libc.shmat.restype = ctypes.c_void_p
+        self.libc.shmdt.argtypes = [ctypes.c_void_p]
+        self.libc.shmctl.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_void_p]
+
+        self.display = self.xlib.XOpenDisplay(None)
+        if not self.display:
+            return False
+        if not self.xext.XShmQueryExtension(self.display):
+            log_warning("X server does not support the MIT-SHM extension")
+            self.xlib.XCloseDisplay(self.display)
+            self.display = None
+            return False
+
+        self.screen = self.xlib.XDefaultScreen(self.display)
+        self.root_window = self.xlib.XDefaultRootWindow(self.display)
+        return True
+
+    def is_available(self) -> bool:
+        return self._available
+
+    @contextmanager
+    def _trap_x_errors(self):
+        """Record X errors in x_error during the block only; Xlib's handler is process-wide (Tk uses it too)."""
+        self.xlib.XSync(self.display, 0)
+        self.x_error = False
+        previous = self.xlib.XSetErrorHandler(self._error_handler)
+        try:
+            yield
+            self.xlib.XSync(self.display, 0)
+        finally:
+            self.xlib.XSetErrorHandler(previous)
+
+    def _release_segment(self):
+        if not self.ximage:
+            return
+        self.xext.XShmDetach(self.display, ctypes.byref(self.shminfo))
+        self.xlib.XSync(self.display, 0)
+        self.ximage.contents.data = None
+        self.xlib.XDestroyImage(self.ximage)
+        self.libc.shmdt(self.shminfo.shmaddr)
+        self.ximage = None
+        self.shminfo = None
+        self.segment_size = (0, 0)
+
+    def _ensure_segment(self, width: int, height: int):
+        if self.ximage and self.segment_size == (width, height):
+            return
+        self._release_segment()
+
+        shminfo = _XShmSegmentInfo()
+        visual = self.xlib.XDefaultVisual(self.display, self.screen)
+        depth = self.xlib.XDefaultDepth(self.display, self.screen)
+        ximage = self.xext.XShmCreateImage(
+            self.display, visual, depth, self._Z_PIXMAP, None, ctypes.byref(shminfo), width, height
+        )
+        if not ximage:
+            raise RuntimeError("XShmCreateImage failed")
+
+        size = ximage.contents.bytes_per_line * height
+        shmid = self.libc.shmget(self._IPC_PRIVATE, size, self._IPC_CREAT | 0o600)
+        if shmid < 0:
+            self.xlib.XDestroyImage(ximage)
+            raise OSError(ctypes.get_errno(), "shmget failed")
+
+        shmaddr = self.libc.shmat(shmid, None, 0)
+        if shmaddr in (None, ctypes.c_void_p(-1).value):
+            self.libc.shmctl(shmid, self._IPC_RMID, None)
+            self.xlib.XDestroyImage(ximage)
+            raise OSError(ctypes.get_errno(), "shmat failed")
+
+        shminfo.shmid = shmid
+        shminfo.shmaddr = shmaddr
+        shminfo.readOnly = 0
+        ximage.contents.data = shmaddr
+
+        with self._trap_x_errors():
+            self.xext.XShmAttach(self.display, ctypes.byref(shminfo))
+        self.libc.shmctl(shmid, self._IPC_RMID, None)
+        if self.x_error:
+            self.libc.shmdt(shmaddr)
+            ximage.contents.data = None
+            self.xlib.XDestroyImage(ximage)
+            raise RuntimeError("XShmAttach failed")
+
+        self.ximage = ximage
+        self.shminfo = shminfo
+        self.segment_size = (width, height)
+
+    def _clamp_region(self, region: tuple) -> tuple:
+        x, y, w, h = region
+        screen_w = self.xlib.XDisplayWidth(self.display, self.screen)
+        screen_h = self.xlib.XDisplayHeight(self.display, self.screen)
+        x = max(0, min(x, screen_w - 1))
+        y = max(0, min(y, screen_h - 1))
+        return x, y, max(1, min(w, screen_w - x)), max(1, min(h, screen_h - y))
+
+    def grab(self, region: tuple, grayscale: bool = False):
+        if not self._available:
+            raise RuntimeError("X11 shared-memory capture is not available")
+
+        with self.lock:
+            x, y, w, h = self._clamp_region(region)
+            self._ensure_segment(w, h)
+
+            ximage = self.ximage.contents
+            if ximage.bits_per_pixel != 32:
+                raise RuntimeError(f"Unsupported X11 pixel format: {ximage.bits_per_pixel} bpp")
+
+            with self._trap_x_errors():
+                ok = self.xext.XShmGetImage(self.display, self.root_window, self.ximage, x, y, self._ALL_PLANES)
+            if not ok or self.x_error:
+                raise RuntimeError("XShmGetImage failed")
+
+            stride = ximage.bytes_per_line
+            raw = (ctypes.c_ubyte * (stride * h)).from_address(ximage.data)
+            if grayscale:
+                bgra = np.frombuffer(raw, dtype=np.uint8).reshape(h, stride // 4, 4)[:, :w]
+                return cv2.cvtColor(bgra, cv2.COLOR_BGRA2GRAY)
+            return Image.frombytes('RGB', (w, h), bytes(raw), 'raw', 'BGRX', stride)
+
+    def close(self):
+        with self.lock:
+            if self.display:
+                self._release_segment()
+                self.xlib.XCloseDisplay(self.display)
+                self.display = None
+            self._available = False
+
+
+CAPTURE_BACKENDS = {
+    "x11shm": X11ShmCaptureBackend,
+    "pil": PILCaptureBackend,
+    "pyautogui": PyAutoGUICaptureBackend,
+}
+
+_backend_instances = {}
+_backend_lock = threading.Lock()
+
+
+def get_backend(name: str) -> CaptureBackend | None:
+    with _backend_lock:
+        if name not in _backend_instances:
+            backend_class = CAPTURE_BACKENDS.get(name)
+            if backend_class is None:
+                log_error(f"Unknown capture backend: {name}")
+                return None
+            try:
+                _backend_instances[name] = backend_class()
+            except Exception as e:
+                log_warning(f"Capture backend '{name}' failed to initialize: {e}")
+                _backend_instances[name] = None
+        backend = _backend_instances[name]
+    if backend is None or not backend.is_available():
+        return None
+    return backend
+
+
+def get_backend_chain() -> list:
+    preferred = config.get('capture_backend', 'auto')
+    if preferred == 'auto':
+        names = ["x11shm", "pil", "pyautogui"]
+    else:
+        names = [preferred] + [name for name in ("pil", "pyautogui") if name != preferred]
+
+    chain = []
+    for name in names:
+        backend = get_backend(name)
+        if backend:
+            chain.append(backend)
+    return chain
+
+
+def grab_region(region: tuple, grayscale: bool = False):
+    for backend in get_backend_chain():
+        try:
+            return backend.grab(region, grayscale=grayscale)
+        except Exception as e:
+            log_warning(f"Capture backend '{backend.name}' failed: {e}")
+    log_error("All capture backends failed")
+    return None
+
+
+def benchmark_backends(region: tuple, runs: int = 30) -> dict:
+    results = {}
+    for name in CAPTURE_BACKENDS:
+        backend = get_backend(name)
+        if not backend:
+            results[name] = None
+            continue
+        for grayscale in (False, True):
+            timings = []
+            try:
+                backend.grab(region, grayscale=grayscale)
+                for _ in range(runs):
+                    start = time.perf_counter()
+                    backend.grab(region, grayscale=grayscale)
+                    timings.append((time.perf_counter() - start) * 1000)
+            except Exception as e:
+                log_warning(f"Benchmark of '{name}' failed: {e}")
+                results[f"{name}{' (gray)' if grayscale else ''}"] = None
+                continue
+            timings.sort()
+            results[f"{name}{' (gray)' if grayscale else ''}"] = {
+                "mean_ms": sum(timings) / len(timings),
+                "p50_ms": timings[len(timings) // 2],
+                "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+            }
+    return results
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare screen capture backends.")
+    parser.add_argument('--region', type=int, nargs=4, metavar=('X', 'Y', 'W', 'H'), default=(0, 0, 800, 600))
+    parser.add_argument('--runs', type=int, default=30)
+    args = parser.parse_args()
+
+    print(f"Capturing region {tuple(args.region)}, {args.runs} runs per backend\n")
+    print(f"{'backend':<20}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for backend_name, stats in benchmark_backends(tuple(args.region), args.runs).items():
+        if stats is None:
+            print(f"{backend_name:<20}{'unavailable':>30}")
+        else:
+            print(f"{backend_name:<20}{stats['mean_ms']:>10.2f}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}")
@@ -11,6 +11,34 @@ DEFAULT_CONFIG = {
     "tray_icon": "default",
     "tray_menu_title": "QuizSnapper",
     "ocr_lang": "eng+ita",
+    "ocr_auto_language": True,
+    "ocr_adaptive_scaling": True,
+    "ocr_auto_crop": True,
+    "ocr_deskew": False,
+    "ocr_deskew_max_angle": 15,
+    "ocr_target_text_height": 28,
+    "ocr_psm": "auto",
+    "ocr_cascade": True,
+    "ocr_min_confidence": 75,
+    "ocr_max_escalated_line_ratio": 0.5,
+    "ocr_memory_budget_mb": 0,
+    "ocr_engine": "tesseract",
+    "ocr_onnx_model_path": "",
+    "ocr_onnx_charset_path": "",
+    "ocr_onnx_input_height": 48,
+    "ocr_onnx_max_width": 1600,
+    "ocr_onnx_threads": 0,
+    "ocr_compaction_enabled": True,
+    "ocr_compaction_rules": {
+        "whitespace": True,
+        "hyphenation": True,
+        "radio_glyphs": True,
+        "duplicate_lines": True,
+        "ui_chrome": True
+    },
+    "ocr_compaction_extra_chrome": [],
+    "capture_backend": "auto",
+    "capture_grayscale": True,
     "popup_enabled": True,
     "popup_position": "bottom_right",
     "popup_width": 420,
@@ -21,6 +49,29 @@ DEFAULT_CONFIG = {
     "ai_provider": "ollama",
     "ollama_model": "deepseek-r1:1.5b",
     "ollama_api_url": "http://localhost:11434/api/generate",
+    "ollama_keep_alive": "5m",
+    "model_routing_enabled": False,
+    "model_routes": {
+        "true_false": {"provider": "ollama", "model": "qwen2.5:0.5b"},
+        "single_choice": {"provider": "ollama", "model": "qwen2.5:1.5b"},
+        "multi_select": {},
+        "match": {},
+        "open": {}
+    },
+    "generation_limits": {
+        "true_false": {"max_tokens": 32, "stop": ["Explanation:"]},
+        "single_choice": {"max_tokens": 96, "stop": ["Explanation:"]},
+        "multi_select": {"max_tokens": 160, "stop": ["Explanation:"]},
+        "match": {"max_tokens": 384, "stop": ["Explanation:"]},
+        "open": {"max_tokens": 768}
+    },
+    "explanation_max_tokens": 1024,
+    "suppress_thinking": True,
+    "stream_early_stop": True,
+    "capture_deadline_s": 0,
+    "deadline_fallback_model": "qwen2.5:0.5b",
+    "deadline_kb_max_chars": 4000,
+    "deadline_max_tokens": 64,
     "api_url": "",
     "api_key": "",
     "api_model": "",
@@ -28,7 +79,31 @@ DEFAULT_CONFIG = {
     "show_explanation": True,
     "clean_output": True,
     "use_pdf_context": False,
-    "knowledge_base_folder": "knowledge_base"
+    "knowledge_base_folder": "knowledge_base",
+    "pdf_ocr_enabled": True,
+    "pdf_ocr_min_chars": 20,
+    "pdf_ocr_dpi": 200,
+    "pdf_ocr_workers": 0,
+    "qa_fast_path_enabled": True,
+    "qa_match_threshold": 0.9,
+    "speculative_ocr_enabled": False,
+    "speculative_ocr_pause_ms": 250,
+    "batch_ocr_workers": 4,
+    "batch_model_concurrency": 2,
+    "server_enabled": False,
+    "server_host": "127.0.0.1",
+    "server_port": 8765,
+    "server_workers": 2,
+    "server_queue_size": 16,
+    "server_cache_size": 256,
+    "server_request_timeout_s": 120,
+    "profile_next_runs": 0,
+    "profile_run_count": 5,
+    "profile_output_folder": "profiles",
+    "profile_top_functions": 25,
+    "multi_question_enabled": True,
+    "multi_question_concurrency": 3,
+    "multi_question_max": 10
 }
 
 def load_config():
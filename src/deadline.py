@@ -0,0 +1,81 @@
+import threading
+import time
+from .utils import log_info
+
+# Starting guesses in seconds; replaced by a moving average of observed stage durations.
+DEFAULT_STAGE_ESTIMATES = {
+    "ocr_heavy": 1.5,
+    "ai_request": 6.0,
+}
+ESTIMATE_SMOOTHING = 0.3
+
+_stage_estimates = dict(DEFAULT_STAGE_ESTIMATES)
+_estimates_lock = threading.Lock()
+
+
+def record_stage_duration(stage: str, seconds: float):
+    with _estimates_lock:
+        previous = _stage_estimates.get(stage)
+        if previous is None:
+            _stage_estimates[stage] = seconds
+        else:
+            _stage_estimates[stage] = previous + ESTIMATE_SMOOTHING * (seconds - previous)
+
+
+def stage_estimate(stage: str) -> float:
+    with _estimates_lock:
+        return _stage_estimates.get(stage, 0.0)
+
+
+class Deadline:
+    """End-to-end time budget for one capture, shared by every stage of the pipeline.
+
+    Stages call degrade() when they drop work to stay within the budget; the applied
+    degradations and per-stage timings are reported once the capture is done.
+    """
+
+    def __init__(self, budget_s: float):
+        self.budget_s = budget_s
+        self.start = time.monotonic()
+        self.degradations = []
+        self.timings = {}
+        self._lock = threading.Lock()
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.start
+
+    def remaining(self) -> float:
+        return max(0.0, self.budget_s - self.elapsed())
+
+    def pressure(self, *stages: str) -> float:
+        """Expected time of the remaining stages relative to the time left (above 1.0 means over budget)."""
+        expected = sum(stage_estimate(stage) for stage in stages)
+        remaining = self.remaining()
+        return expected / remaining if remaining > 0 else float('inf')
+
+    def degrade(self, name: str, detail: str = ''):
+        with self._lock:
+            if name in self.degradations:
+                return
+            self.degradations.append(name)
+        log_info(f"Deadline: {name}" + (f" ({detail})" if detail else "")
+                 + f", {self.remaining():.1f}s of {self.budget_s:.1f}s left")
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+        record_stage_duration(stage, seconds)
+
+    def summary(self) -> str:
+        timings = ', '.join(f"{stage} {seconds:.2f}s" for stage, seconds in self.timings.items())
+        summary = f"total {self.elapsed():.2f}s of {self.budget_s:.1f}s budget"
+        if timings:
+            summary += f" ({timings})"
+        if self.degradations:
+            summary += f"; degraded: {', '.join(self.degradations)}"
+        return summary
+
+
+def create_deadline(current_config: dict) -> Deadline | None:
+    budget_s = current_config.get('capture_deadline_s', 0)
+    return Deadline(budget_s) if budget_s and budget_s > 0 else None
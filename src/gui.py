@@ -34,6 +34,22 @@ except ImportError:
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+class PopupSession:
+    def __init__(self, popup, generation):
+        self.popup = popup
+        self.generation = generation
+
+    @property
+    def is_active(self):
+        return self.popup.is_active and self.popup.generation == self.generation
+
+    def update_text(self, new_text: str, new_title: str | None = None, auto_close_when_final: bool = False):
+        self.popup.update_text(new_text, new_title, auto_close_when_final, generation=self.generation)
+
+    def close(self):
+        self.popup.close(generation=self.generation)
+
+
 class ResponsePopup:
     def __init__(self, parent_tk_root, title="Processing...", initial_text="Please wait...", start_auto_close=False):
         self.parent_tk_root = parent_tk_root
@@ -46,6 +62,8 @@ class ResponsePopup:
         self.drag_start_x = None
         self.drag_start_y = None
         self._pending_updates = []
+        self.generation = 0
+        self.window_failed = False
 
         if not self.parent_tk_root:
             log_error("ResponsePopup initialization failed")
@@ -53,11 +71,36 @@ class ResponsePopup:
 
         self.parent_tk_root.after(0, self._create_window, title, initial_text, start_auto_close)
 
+    def show(self, title: str, text: str, start_auto_close: bool = False) -> PopupSession:
+        self.generation += 1
+        generation = self.generation
+        if self.root and self.root.winfo_exists():
+            self.root.after(0, self._do_show, title, text, start_auto_close, generation)
+        else:
+            self._pending_updates.append((text, title, start_auto_close, generation))
+        return PopupSession(self, generation)
+
+    def _do_show(self, title: str, text: str, start_auto_close: bool, generation: int):
+        if generation != self.generation or not self.root or not self.root.winfo_exists():
+            return
+
+        self._set_content(title, text)
+        self._position_window()
+        self.root.deiconify()
+        self.root.lift()
+        self.is_active = True
+
+        if start_auto_close:
+            self._schedule_auto_close()
+        else:
+            self._cancel_auto_close()
+
     def _create_window(self, title_str, text_content, start_auto_close):
         if not self.parent_tk_root or not self.parent_tk_root.winfo_exists():
             log_error("Cannot create popup window")
             self.is_active = False
             self.root = None
+            self.window_failed = True
             return
 
         try:
@@ -128,7 +171,7 @@ class ResponsePopup:
             for update_args in queued_updates:
                 self._do_update_text(*update_args)
 
-            if start_auto_close and self.is_active:
+            if start_auto_close and self.is_active and not queued_updates:
                 self._schedule_auto_close()
 
         except Exception as e:
@@ -140,32 +183,32 @@ class ResponsePopup:
                     pass
             self.root = None
             self.is_active = False
+            self.window_failed = True
 
 
-    def update_text(self, new_text: str, new_title: str | None = None, auto_close_when_final: bool = False):
+    def update_text(self, new_text: str, new_title: str | None = None, auto_close_when_final: bool = False,
+                    generation: int | None = None):
+        if generation is None:
+            generation = self.generation
         if self.root and self.root.winfo_exists():
-            self.root.after(0, self._do_update_text, new_text, new_title, auto_close_when_final)
+            self.root.after(0, self._do_update_text, new_text, new_title, auto_close_when_final, generation)
         else:
-            self._pending_updates.append((new_text, new_title, auto_close_when_final))
+            self._pending_updates.append((new_text, new_title, auto_close_when_final, generation))
 
 
-    def _do_update_text(self, new_text: str, new_title: str | None, auto_close_when_final: bool):
+    def _do_update_text(self, new_text: str, new_title: str | None, auto_close_when_final: bool,
+                        generation: int | None = None):
         if not self.root or not self.root.winfo_exists():
             return
+        if generation is not None and generation != self.generation:
+            return
 
         try:
-            if new_title is not None and self.title_label_widget:
-                self.title_label_widget.config(text=new_title)
-
-            if self.text_area:
-                current_state = self.text_area.cget('state')
-                self.text_area.configure(state='normal')
-                self.text_area.delete(1.0, tk.END)
-                self.text_area.insert(tk.END, new_text)
-                self.text_area.configure(state=current_state)
+            self._set_content(new_title, new_text)
 
             self.root.deiconify()
             self.root.lift()
+            self.is_active = True
 
             if auto_close_when_final:
                 self._schedule_auto_close()
@@ -176,6 +219,18 @@ class ResponsePopup:
             log_error(f"ResponsePopup: Error during _do_update_text: {e}", exc_info=True)
 
 
+    def _set_content(self, title: str | None, text: str):
+        if title is not None and self.title_label_widget:
+            self.title_label_widget.config(text=title)
+
+        if self.text_area:
+            current_state = self.text_area.cget('state')
+            self.text_area.configure(state='normal')
+            self.text_area.delete(1.0, tk.END)
+            self.text_area.insert(tk.END, text)
+            self.text_area.configure(state=current_state)
+
+
     def _start_move(self, event):
         if self.root:
             self.drag_start_x = event.x
@@ -235,7 +290,7 @@ class ResponsePopup:
         delay_ms = config.get("popup_auto_close_delay_ms", 7000)
         if delay_ms > 0:
             self._cancel_auto_close()
-            self.after_id_autoclose = self.root.after(delay_ms, self.close)
+            self.after_id_autoclose = self.root.after(delay_ms, self._do_close, self.generation)
 
 
     def _cancel_auto_close(self):
@@ -244,15 +299,26 @@ class ResponsePopup:
             self.after_id_autoclose = None
 
 
-    def close(self):
+    def close(self, generation: int | None = None):
         if self.parent_tk_root and self.parent_tk_root.winfo_exists():
-            self.parent_tk_root.after(0, self._do_close)
+            self.parent_tk_root.after(0, self._do_close, generation)
         elif self.root and self.root.winfo_exists():
-            self.root.after(0, self._do_close)
+            self.root.after(0, self._do_close, generation)
         else:
             self._do_close_cleanup_state()
 
-    def _do_close(self):
+    def _do_close(self, generation: int | None = None):
+        if generation is not None and generation != self.generation:
+            return
+        self._cancel_auto_close()
+        if self.root and self.root.winfo_exists():
+            try:
+                self.root.withdraw()
+            except tk.TclError as e:
+                log_error(f"Error hiding window: {e}", exc_info=True)
+        self.is_active = False
+
+    def destroy(self):
         self._cancel_auto_close()
         if self.root and self.root.winfo_exists():
             try:
@@ -266,6 +332,71 @@ class ResponsePopup:
         self.is_active = False
 
 
+class NoticePopup:
+    """Small self-closing status notice, kept apart from the answer popup so it never takes over a capture."""
+
+    def __init__(self, parent_tk_root):
+        self.parent_tk_root = parent_tk_root
+        self.root = None
+        self.label = None
+        self.after_id_close = None
+
+    def show(self, text: str, duration_ms: int = 2000):
+        if self.parent_tk_root and self.parent_tk_root.winfo_exists():
+            self.parent_tk_root.after(0, self._do_show, text, duration_ms)
+
+    def _do_show(self, text: str, duration_ms: int):
+        try:
+            if not self.root or not self.root.winfo_exists():
+                self.root = tk.Toplevel(self.parent_tk_root)
+                self.root.attributes("-topmost", True)
+                self.root.overrideredirect(True)
+                self.root.attributes("-alpha", config.get("popup_transparency", 0.95))
+                self.root.configure(bg="#404040")
+                self.label = tk.Label(self.root, bg="#1e1e1e", fg="#e0e0e0", font=("Segoe UI", 10, "bold"),
+                                      padx=14, pady=8)
+                self.label.pack(padx=1, pady=1)
+
+            self.label.config(text=text)
+            self.root.update_idletasks()
+            self._position_window()
+            self.root.deiconify()
+            self.root.lift()
+
+            if self.after_id_close:
+                self.root.after_cancel(self.after_id_close)
+            self.after_id_close = self.root.after(duration_ms, self._do_close)
+        except Exception as e:
+            log_error(f"NoticePopup: Error showing notice: {e}", exc_info=True)
+
+    def _position_window(self):
+        position = config.get("popup_position", "bottom_right").lower()
+        width = self.root.winfo_reqwidth()
+        height = self.root.winfo_reqheight()
+        screen_width = self.root.winfo_screenwidth()
+        screen_height = self.root.winfo_screenheight()
+        # Sit beyond the answer popup so both stay readable while a capture is running.
+        popup_height = config.get("popup_height", 280) + 10
+
+        x = 20 if position.endswith("left") else screen_width - width - 20
+        if position.startswith("top"):
+            y = 20 + popup_height
+        elif position == "center":
+            x = (screen_width - width) // 2
+            y = (screen_height - height) // 2 - popup_height // 2 - height
+        else:
+            y = screen_height - height - 60 - popup_height
+        self.root.geometry(f"+{int(x)}+{int(y)}")
+
+    def _do_close(self):
+        self.after_id_close = None
+        if self.root and self.root.winfo_exists():
+            try:
+                self.root.withdraw()
+            except tk.TclError as e:
+                log_error(f"Error hiding notice: {e}", exc_info=True)
+
+
 class SystemTrayApp:
     def __init__(self, on_exit_callback=None, on_capture_callback=None):
         self.root = tk.Tk()
@@ -273,6 +404,8 @@ class SystemTrayApp:
 
         self.on_exit_callback = on_exit_callback
         self.on_capture_callback = on_capture_callback
+        self.popup = None
+        self.notice = NoticePopup(self.root)
         self.icon = self._create_tray_icon()
 
     def _create_tray_icon(self):
@@ -302,6 +435,7 @@ class SystemTrayApp:
             pystray.MenuItem('Auto-Select Answers', self._toggle_auto_select_action, checked=self._is_auto_select_enabled),
             pystray.MenuItem('Show Popup', self._toggle_popup_action, checked=self._is_popup_enabled),
             pystray.MenuItem('Show Explanation', self._toggle_explanation_action, checked=self._is_explanation_enabled),
+            pystray.MenuItem('Profile Next Runs', self._toggle_profiling_action, checked=self._is_profiling_requested),
             pystray.MenuItem('Open Configuration', self._open_config_action),
             pystray.MenuItem('View Logs', self._view_logs_action),
             pystray.MenuItem('Exit', self._exit_action)
@@ -333,7 +467,7 @@ class SystemTrayApp:
             status = "enabled" if new_state else "disabled"
             log_info(f"Auto-select answers {status} via tray menu")
             
-            self._recreate_tray_icon()
+            self._refresh_tray_menu()
         else:
             log_error("Auto-selector not available")
 
@@ -354,7 +488,7 @@ class SystemTrayApp:
         status = "enabled" if new_state else "disabled"
         log_info(f"Popup {status} via tray menu")
         
-        self._recreate_tray_icon()
+        self._refresh_tray_menu()
 
     def _is_explanation_enabled(self, item):
         return config.get('show_explanation', False)
@@ -373,7 +507,19 @@ class SystemTrayApp:
         status = "enabled" if new_state else "disabled"
         log_info(f"Show explanation {status} via tray menu")
         
-        self._recreate_tray_icon()
+        self._refresh_tray_menu()
+
+    def _is_profiling_requested(self, item):
+        # Counted down by the capture thread, so the cached config would keep the check mark.
+        return load_config().get('profile_next_runs', 0) > 0
+
+    def _toggle_profiling_action(self, icon, item):
+        from .profiling import request_profiling
+        if load_config().get('profile_next_runs', 0) > 0:
+            request_profiling(0)
+        else:
+            request_profiling()
+        self._refresh_tray_menu()
 
 
     def _open_config_action(self, icon, item):
@@ -410,34 +556,34 @@ class SystemTrayApp:
             self._show_generic_error_dialog("Error", f"Failed to open log file:\n{e}")
 
 
-    def _recreate_tray_icon(self):
+    def _refresh_tray_menu(self):
+        global config
+        config = load_config()
         try:
             if self.icon:
-                old_icon = self.icon
-                
-                self.icon = self._create_tray_icon()
-                
-                threading.Thread(target=self.icon.run, daemon=True).start()
-                
-                old_icon.stop()
-                
-                log_info("Tray icon recreated successfully")
+                self.icon.update_menu()
         except Exception as e:
-            log_error(f"Failed to recreate tray icon: {e}", exc_info=True)
+            log_error(f"Failed to refresh tray menu: {e}", exc_info=True)
     
     def _exit_action(self, icon, item):
         self.stop()
 
     def _show_response_popup(self, title, message, start_auto_close=False):
         try:
-            popup = ResponsePopup(self.root, title, message, start_auto_close)
-            return popup
+            if self.popup is None or self.popup.window_failed:
+                self.popup = ResponsePopup(self.root, title, message, start_auto_close)
+                return PopupSession(self.popup, self.popup.generation)
+            return self.popup.show(title, message, start_auto_close)
         except Exception as e:
             log_error(f"Failed to create popup: {e}", exc_info=True)
             self._show_generic_error_dialog("Popup Error", f"Failed to create response window:\n{e}")
             return None
 
 
+    def _show_notice(self, message, duration_ms=2000):
+        self.notice.show(message, duration_ms)
+
+
     def _show_generic_error_dialog(self, title, message):
         self.root.after(0, tkinter.messagebox.showerror, title, message)
 
@@ -452,6 +598,9 @@ class SystemTrayApp:
             self.on_exit_callback()
         if self.icon:
             self.icon.stop()
+        if self.popup:
+            self.popup.destroy()
+            self.popup = None
         if self.root and self.root.winfo_exists():
             self.root.quit()
             self.root.destroy()
\ No newline at end of file
@@ -1,13 +1,18 @@
 import threading
+import time
 import keyboard
 
 from .config_manager import config, load_config, save_config
-from .screenshot import capture_selected_region
-from .ocr import image_to_text
-from .ollama_integration import get_ai_response
+from .screenshot import capture_selected_region, init_region_selector, get_last_capture_region
+from .ocr_engines import recognize
+from .ollama_integration import get_ai_response, load_pdf_context
+from .questions import split_questions, answer_questions, format_answers
+from .deadline import create_deadline
+from .profiling import run_profiled
 from .gui import SystemTrayApp
 from .utils import initial_checks, log_info, log_error
 from .auto_selector import get_auto_selector
+from .server import start_background_server
 
 processing_lock = threading.Lock()
 app_running = True
@@ -17,7 +22,15 @@ def process_screenshot_workflow(tray_app_instance_ref: SystemTrayApp):
     if not processing_lock.acquire(blocking=False):
         log_info("Capture already in progress. Ignoring new request.")
         return
+    try:
+        run_profiled(_screenshot_workflow, tray_app_instance_ref,
+                     on_last_run=tray_app_instance_ref._refresh_tray_menu)
+    finally:
+        processing_lock.release()
+        log_info("Screenshot workflow completed")
 
+
+def _screenshot_workflow(tray_app_instance_ref: SystemTrayApp):
     active_popup = None
     screenshot_region = None
     current_config = load_config()
@@ -35,15 +48,42 @@ def process_screenshot_workflow(tray_app_instance_ref: SystemTrayApp):
             if not active_popup:
                 log_error("Failed to create popup window")
 
-        pil_image = capture_selected_region()
-        if not pil_image:
+        captured_image = capture_selected_region(grayscale=current_config.get('capture_grayscale', True))
+        if captured_image is None:
             log_info("Screenshot capture cancelled")
             if active_popup:
                 active_popup.close()
             return
 
-        text_from_ocr = image_to_text(pil_image)
-        ai_response = get_ai_response(text_from_ocr)
+        screenshot_region = get_last_capture_region()
+        deadline = create_deadline(current_config)
+        ocr_start = time.perf_counter()
+        ocr_result = recognize(captured_image, region=screenshot_region, deadline=deadline)
+        if deadline:
+            deadline.record('ocr', time.perf_counter() - ocr_start)
+        questions = [ocr_result.text]
+        if current_config.get('multi_question_enabled', True):
+            questions = split_questions(ocr_result.text)
+
+        if len(questions) > 1:
+            log_info(f"Capture holds {len(questions)} questions, answering them separately")
+
+            def _show_partial_answers(answers):
+                if popup_enabled and active_popup:
+                    done = sum(1 for answer in answers if answer is not None)
+                    active_popup.update_text(format_answers(answers), new_title=f"Answers ({done}/{len(answers)})")
+
+            answers = answer_questions(questions, on_answer=_show_partial_answers, deadline=deadline)
+            ai_response = format_answers(answers)
+            selector_response = '\n'.join(answer for answer in answers if not answer.startswith("Error:"))
+        else:
+            ai_response = get_ai_response(ocr_result.text, deadline=deadline)
+            selector_response = ai_response
+
+        if deadline:
+            log_info(f"Capture timing: {deadline.summary()}")
+            if deadline.degradations:
+                ai_response += f"\n\n[Fast mode: {', '.join(deadline.degradations)}]"
 
         if popup_enabled and active_popup:
             active_popup.update_text(
@@ -57,7 +97,7 @@ def process_screenshot_workflow(tray_app_instance_ref: SystemTrayApp):
         auto_selector = get_auto_selector()
         if auto_selector.is_enabled():
             log_info("Auto-selector is enabled, attempting to select answers")
-            auto_selector.find_and_click_answers(ai_response, screenshot_region)
+            auto_selector.find_and_click_answers(selector_response, screenshot_region, ocr_result)
 
     except Exception as e:
         log_error(f"Workflow error: {e}", exc_info=True)
@@ -67,10 +107,6 @@ def process_screenshot_workflow(tray_app_instance_ref: SystemTrayApp):
                 new_title="Error",
                 auto_close_when_final=True
             )
-    finally:
-        if processing_lock.locked():
-            processing_lock.release()
-            log_info("Screenshot workflow completed")
 
 
 def toggle_auto_selector(tray_app_instance_ref: SystemTrayApp):
@@ -88,15 +124,9 @@ def toggle_auto_selector(tray_app_instance_ref: SystemTrayApp):
     
     log_info(f"Auto-selector toggled via shortcut: {status_text}")
     
-    tray_app_instance_ref._recreate_tray_icon()
+    tray_app_instance_ref._refresh_tray_menu()
     
-    popup = tray_app_instance_ref._show_response_popup(
-        title="Auto-Selector",
-        message=message,
-        start_auto_close=False
-    )
-    if popup:
-        tray_app_instance_ref.root.after(2000, popup.close)
+    tray_app_instance_ref._show_notice(message)
 
 
 def toggle_popup(tray_app_instance_ref: SystemTrayApp):
@@ -111,15 +141,9 @@ def toggle_popup(tray_app_instance_ref: SystemTrayApp):
     
     log_info(f"Popup display toggled via shortcut: {status_text}")
     
-    tray_app_instance_ref._recreate_tray_icon()
+    tray_app_instance_ref._refresh_tray_menu()
     
-    popup = tray_app_instance_ref._show_response_popup(
-        title="Popup Display",
-        message=message,
-        start_auto_close=False
-    )
-    if popup:
-        tray_app_instance_ref.root.after(2000, popup.close)
+    tray_app_instance_ref._show_notice(message)
 
 
 def setup_hotkey(tray_app_instance_ref: SystemTrayApp):
@@ -173,6 +197,7 @@ def main():
         on_exit_callback=on_app_exit, 
         on_capture_callback=process_screenshot_workflow
     )
+    init_region_selector(tray_app.root)
     
     if not initial_checks(gui_manager_instance=tray_app):
         log_error("Initial checks failed. Some features may not work.")
@@ -180,6 +205,12 @@ def main():
     if not setup_hotkey(tray_app):
         log_error("Hotkey setup failed")
 
+    if current_config.get('server_enabled', False):
+        start_background_server()
+
+    if current_config.get('use_pdf_context', False):
+        threading.Thread(target=load_pdf_context, name="knowledge-base-preload", daemon=True).start()
+
     log_info("Starting system tray...")
     tray_app.run()
 
@@ -0,0 +1,323 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .utils import log_info, log_warning
+
+DEFAULT_SCRIPT = {
+    "models": ["deepseek-r1:1.5b"],
+    "latency_ms": 0,
+    "ttft_ms": 0,
+    "tokens_per_s": 0,
+    "responses": [],
+    "default_response": "True",
+    "errors": [],
+    "error_rate": 0.0,
+    "error_status": 500,
+    "seed": 0
+}
+
+DEFAULT_REQUEST_LOG_SIZE = 1000
+
+_TOKEN_PATTERN = re.compile(r'\s*\S+|\s+$')
+
+
+def tokenize(text: str) -> list:
+    return _TOKEN_PATTERN.findall(text)
+
+
+class MockScript:
+    """Behaviour of the mock server; all fields are optional (see DEFAULT_SCRIPT).
+
+    responses: [{"match": regex, "response": text}] checked in order against the prompt.
+    errors: [{"status": 500, "count": 2}] returned, in order, to the next requests
+    (status 0 drops the connection without answering). error_rate/error_status add
+    seeded random failures after the scripted ones.
+    """
+
+    def __init__(self, script: dict | None = None):
+        self._lock = threading.Lock()
+        self.load(script or {})
+
+    def load(self, script: dict):
+        with self._lock:
+            self.settings = {**DEFAULT_SCRIPT, **script}
+            self._errors = [error['status'] for error in self.settings['errors']
+                            for _ in range(error.get('count', 1))]
+            self._random = random.Random(self.settings['seed'])
+
+    def get(self, key: str):
+        with self._lock:
+            return self.settings[key]
+
+    def next_error(self) -> int | None:
+        with self._lock:
+            if self._errors:
+                return self._errors.pop(0)
+            if self.settings['error_rate'] and self._random.random() < self.settings['error_rate']:
+                return self.settings['error_status']
+            return None
+
+    def response_for(self, prompt: str) -> str:
+        with self._lock:
+            for rule in self.settings['responses']:
+                if re.search(rule['match'], prompt, re.IGNORECASE | re.DOTALL):
+                    return rule['response']
+            return self.settings['default_response']
+
+
+class MockModelRequestHandler(BaseHTTPRequestHandler):
+    script: MockScript = None
+    request_log: deque = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        log_info(f"Mock model server {self.address_string()} - {format % args}")
+
+    def _send_json(self, status: int, body: dict):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get('Content-Length', 0))
+        if length <= 0:
+            return {}
+        return json.loads(self.rfile.read(length))
+
+    def do_GET(self):
+        if self.path == '/api/tags':
+            now = datetime.now(timezone.utc).isoformat()
+            models = [{"name": name, "model": name, "modified_at": now, "size": 0}
+                      for name in self.script.get('models')]
+            self._send_json(200, {"models": models})
+        elif self.path == '/mock/requests':
+            self._send_json(200, {"requests": list(self.request_log)})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        try:
+            payload = self._read_json()
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": "invalid JSON"})
+            return
+
+        if self.path == '/mock/script':
+            self.script.load(payload)
+            self.request_log.clear()
+            self._send_json(200, {"status": "ok"})
+            return
+        if self.path not in ('/api/generate', '/v1/chat/completions'):
+            self._send_json(404, {"error": "not found"})
+            return
+
+        entry = {"path": self.path, "payload": payload, "received": time.time(), "tokens_sent": 0,
+                 "cancelled": False, "status": 200}
+        self.request_log.append(entry)
+        time.sleep(self.script.get('latency_ms') / 1000)
+
+        status = self.script.next_error()
+        if status is not None:
+            entry['status'] = status
+            if status == 0:
+                self.close_connection = True
+                self.connection.close()
+                return
+            self._send_json(status, {"error": {"message": f"injected error {status}"}})
+            return
+
+        if self.path == '/api/generate':
+            self._generate(payload, entry)
+        else:
+            self._chat_completions(payload, entry)
+
+    def _tokens(self, prompt: str, max_tokens: int | None, stop: list) -> tuple:
+        text = self.script.response_for(prompt)
+        done_reason = "stop"
+        for sequence in stop or []:
+            position = text.find(sequence)
+            if position != -1:
+                text = text[:position]
+        tokens = tokenize(text)
+        if max_tokens and len(tokens) > max_tokens:
+            tokens = tokens[:max_tokens]
+            done_reason = "length"
+        return tokens, done_reason
+
+    def _pace(self, index: int):
+        if index == 0:
+            time.sleep(self.script.get('ttft_ms') / 1000)
+        elif self.script.get('tokens_per_s'):
+            time.sleep(1 / self.script.get('tokens_per_s'))
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _stream(self, content_type: str, chunks, entry: dict):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            for data in chunks:
+                self._write_chunk(data)
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            entry['cancelled'] = True
+            self.close_connection = True
+            log_info(f"Mock model server: client closed the stream after {entry['tokens_sent']} tokens")
+
+    def _generate(self, payload: dict, entry: dict):
+        options = payload.get('options') or {}
+        model = payload.get('model', '')
+        tokens, done_reason = self._tokens(payload.get('prompt', ''), options.get('num_predict'), options.get('stop'))
+
+        def final(extra: dict) -> dict:
+            return {"model": model, "created_at": datetime.now(timezone.utc).isoformat(), "done": True,
+                    "done_reason": done_reason, "eval_count": len(tokens), **extra}
+
+        if not payload.get('stream', True):
+            for index in range(len(tokens)):
+                self._pace(index)
+            entry['tokens_sent'] = len(tokens)
+            self._send_json(200, final({"response": ''.join(tokens)}))
+            return
+
+        def chunks():
+            for index, token in enumerate(tokens):
+                self._pace(index)
+                yield json.dumps({"model": model, "response": token, "done": False}).encode() + b"\n"
+                entry['tokens_sent'] = index + 1
+            yield json.dumps(final({"response": ""})).encode() + b"\n"
+
+        self._stream('application/x-ndjson', chunks(), entry)
+
+    def _chat_completions(self, payload: dict, entry: dict):
+        prompt = '\n'.join(str(message.get('content', '')) for message in payload.get('messages', []))
+        stop = payload.get('stop')
+        tokens, done_reason = self._tokens(prompt, payload.get('max_tokens'), [stop] if isinstance(stop, str) else stop)
+        finish_reason = "length" if done_reason == "length" else "stop"
+        base = {"id": f"mock-{int(entry['received'] * 1000)}", "created": int(entry['received']),
+                "model": payload.get('model', '')}
+
+        if not payload.get('stream', False):
+            for index in range(len(tokens)):
+                self._pace(index)
+            entry['tokens_sent'] = len(tokens)
+            self._send_json(200, {
+                **base, "object": "chat.completion",
+                "choices": [{"index": 0, "finish_reason": finish_reason,
+                             "message": {"role": "assistant", "content": ''.join(tokens)}}],
+                "usage": {"prompt_tokens": len(tokenize(prompt)), "completion_tokens": len(tokens),
+                          "total_tokens": len(tokenize(prompt)) + len(tokens)}
+            })
+            return
+
+        def chunks():
+            for index, token in enumerate(tokens):
+                self._pace(index)
+                chunk = {**base, "object": "chat.completion.chunk",
+                         "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+                yield f"data: {json.dumps(chunk)}\n\n".encode()
+                entry['tokens_sent'] = index + 1
+            chunk = {**base, "object": "chat.completion.chunk",
+                     "choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}]}
+            yield f"data: {json.dumps(chunk)}\n\n".encode()
+            yield b"data: [DONE]\n\n"
+
+        self._stream('text/event-stream', chunks(), entry)
+
+
+class MockModelServer:
+    """In-process mock server; use as a context manager or call start()/stop().
+
+    Only the last request_log_size requests are kept for /mock/requests (0 keeps none).
+    """
+
+    def __init__(self, script: dict | None = None, host: str = '127.0.0.1', port: int = 0,
+                 request_log_size: int = DEFAULT_REQUEST_LOG_SIZE):
+        self.script = MockScript(script)
+        self.request_log = deque(maxlen=request_log_size)
+        handler = type('ConfiguredMockModelRequestHandler', (MockModelRequestHandler,), {
+            'script': self.script,
+            'request_log': self.request_log
+        })
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'MockModelServer':
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="mock-model-server", daemon=True)
+        self.thread.start()
+        log_info(f"Mock model server listening on {self.url}")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> 'MockModelServer':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mock Ollama / OpenAI-compatible server for offline testing")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11434)
+    parser.add_argument('--script', help="JSON file with the mock behaviour (see MockScript)")
+    parser.add_argument('--latency-ms', type=float, help="Delay before the response starts")
+    parser.add_argument('--ttft-ms', type=float, help="Time to first token")
+    parser.add_argument('--tokens-per-s', type=float, help="Token rate after the first token (0 = unlimited)")
+    parser.add_argument('--response', help="Default canned response")
+    parser.add_argument('--model', action='append', help="Model name listed by /api/tags (repeatable)")
+    parser.add_argument('--request-log-size', type=int, default=DEFAULT_REQUEST_LOG_SIZE,
+                        help="Requests kept for /mock/requests (0 = none)")
+    args = parser.parse_args(argv)
+
+    script = {}
+    if args.script:
+        with open(args.script, 'r', encoding='utf-8') as f:
+            script = json.load(f)
+    overrides = {
+        "latency_ms": args.latency_ms,
+        "ttft_ms": args.ttft_ms,
+        "tokens_per_s": args.tokens_per_s,
+        "default_response": args.response,
+        "models": args.model
+    }
+    script.update({key: value for key, value in overrides.items() if value is not None})
+
+    server = MockModelServer(script, args.host, args.port, args.request_log_size)
+    print(f"Mock model server running on {server.url}")
+    print(f"  Ollama:  {server.url}/api/generate, {server.url}/api/tags")
+    print(f"  OpenAI:  {server.url}/v1/chat/completions")
+    print(f"  Control: POST {server.url}/mock/script, GET {server.url}/mock/requests")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        log_warning("Mock model server interrupted")
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,82 +1,740 @@
+import hashlib
+import math
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
 import pytesseract
-from PIL import Image, ImageEnhance, ImageFilter, ImageOps
+from PIL import Image
 import numpy as np
 import cv2
 from .config_manager import config
-from .utils import log_info, log_error
+from .deadline import Deadline
+from .ocr_language import narrow_languages, get_cached_languages, cache_languages
+from .utils import LRUCache, log_info, log_error
 
 
-def preprocess_image_for_ocr(image: Image.Image) -> Image.Image:
-    width, height = image.size
+class BufferPool:
+    def __init__(self):
+        self._local = threading.local()
+
+    def _buffers(self) -> dict:
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None:
+            buffers = self._local.buffers = {}
+            self._local.peak_bytes = 0
+        return buffers
+
+    def get(self, name: str, shape: tuple, dtype=np.uint8) -> np.ndarray:
+        buffers = self._buffers()
+        buffer = buffers.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffers.pop(name, None)
+            buffer = np.empty(shape, dtype=dtype)
+            buffers[name] = buffer
+            self._local.peak_bytes = max(self._local.peak_bytes, self.total_bytes())
+        return buffer
+
+    def total_bytes(self) -> int:
+        return sum(buffer.nbytes for buffer in self._buffers().values())
+
+    def peak_bytes(self) -> int:
+        self._buffers()
+        return self._local.peak_bytes
+
+    def reset_peak(self):
+        self._buffers()
+        self._local.peak_bytes = self.total_bytes()
+
+    def release(self):
+        self._local.buffers = {}
+        self._local.peak_bytes = 0
+
+
+_buffer_pool = BufferPool()
+
+class OCRResult:
+    """Recognized words with boxes in capture coordinates, plus the reading-order text."""
+
+    def __init__(self, text: str = '', words: list | None = None, boxes: np.ndarray | None = None,
+                 confidences: np.ndarray | None = None, line_ids: np.ndarray | None = None,
+                 block_ids: np.ndarray | None = None, languages: str = '', psm: int | None = None):
+        self.text = text
+        self.words = words or []
+        self.boxes = boxes if boxes is not None else np.zeros((0, 4), dtype=np.int32)
+        self.confidences = confidences if confidences is not None else np.zeros(0, dtype=np.float32)
+        self.line_ids = line_ids if line_ids is not None else np.zeros(0, dtype=np.int32)
+        self.block_ids = block_ids if block_ids is not None else np.zeros(0, dtype=np.int32)
+        self.languages = languages
+        self.psm = psm
+
+    @classmethod
+    def from_lines(cls, lines: list, scale_factor: float, origin: tuple, languages: str, psm: int) -> 'OCRResult':
+        words, boxes, confidences, line_ids, block_ids = [], [], [], [], []
+        blocks = {}
+        for line_id, line in enumerate(lines):
+            block_id = blocks.setdefault(line['key'][:-2], len(blocks))
+            for text, left, top, right, bottom, confidence in line['words']:
+                words.append(text)
+                boxes.append((left, top, right - left, bottom - top))
+                confidences.append(confidence)
+                line_ids.append(line_id)
+                block_ids.append(block_id)
+
+        boxes = np.array(boxes, dtype=np.float32).reshape(-1, 4) / scale_factor
+        boxes[:, 0] += origin[0]
+        boxes[:, 1] += origin[1]
+        return cls(
+            text=_lines_to_text(lines).strip(),
+            words=words,
+            boxes=np.rint(boxes).astype(np.int32),
+            confidences=np.array(confidences, dtype=np.float32),
+            line_ids=np.array(line_ids, dtype=np.int32),
+            block_ids=np.array(block_ids, dtype=np.int32),
+            languages=languages,
+            psm=psm
+        )
+
+    def shifted(self, dx: int, dy: int) -> 'OCRResult':
+        boxes = self.boxes.copy()
+        boxes[:, 0] += dx
+        boxes[:, 1] += dy
+        return OCRResult(self.text, list(self.words), boxes, self.confidences, self.line_ids, self.block_ids,
+                         self.languages, self.psm)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    @property
+    def mean_confidence(self) -> float:
+        return float(self.confidences.mean()) if len(self.words) else 0.0
+
+    def lines(self) -> list:
+        result = []
+        for line_id in np.unique(self.line_ids):
+            indices = np.flatnonzero(self.line_ids == line_id)
+            left, top = self.boxes[indices, 0].min(), self.boxes[indices, 1].min()
+            right = (self.boxes[indices, 0] + self.boxes[indices, 2]).max()
+            bottom = (self.boxes[indices, 1] + self.boxes[indices, 3]).max()
+            result.append({
+                "text": ' '.join(self.words[i] for i in indices),
+                "box": (int(left), int(top), int(right - left), int(bottom - top)),
+                "confidence": float(self.confidences[indices].mean()),
+                "block": int(self.block_ids[indices[0]])
+            })
+        return result
+
+    def to_data(self, offset: tuple = (0, 0)) -> dict:
+        """Word data in pytesseract's image_to_data DICT layout, shifted by offset (e.g. to screen coordinates)."""
+        return {
+            "text": list(self.words),
+            "left": [int(x) + offset[0] for x in self.boxes[:, 0]],
+            "top": [int(y) + offset[1] for y in self.boxes[:, 1]],
+            "width": [int(w) for w in self.boxes[:, 2]],
+            "height": [int(h) for h in self.boxes[:, 3]],
+            "conf": [float(c) for c in self.confidences],
+            "line_num": [int(i) for i in self.line_ids],
+            "block_num": [int(i) for i in self.block_ids]
+        }
+
+
+_result_cache = LRUCache(8)
+# Keyed on the auto-cropped text area, so a capture that differs only in its empty
+# margins (e.g. a slightly different selection of the same question) is reused.
+_content_cache = LRUCache(8)
+
+ANALYSIS_MAX_PIXELS = 1000000
+LANGUAGE_PROBE_MAX_PIXELS = 400000
+AUTO_CROP_MIN_SAVING = 0.9
+OCR_BYTES_PER_PIXEL = 12
+SKIP_DENOISE_PRESSURE = 1.0
+DROP_HEAVY_OCR_PRESSURE = 1.5
+
+
+def _to_gray_array(image) -> np.ndarray:
+    img_array = np.asarray(image)
+
+    if img_array.ndim == 2:
+        return img_array
+
+    gray = _buffer_pool.get('gray', img_array.shape[:2])
+    if img_array.shape[2] == 4:
+        cv2.cvtColor(img_array, cv2.COLOR_RGBA2GRAY, dst=gray)
+    else:
+        cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY, dst=gray)
+    return gray
+
+
+def pixel_count_scale_factor(width: int, height: int) -> float:
     total_pixels = width * height
-    log_info(f"Preprocessing image for OCR: {width}x{height} ({total_pixels} pixels)")
-    
     if total_pixels < 500000:
-        scale_factor = 3.0
         log_info("Small image detected - using aggressive upscaling")
+        return 3.0
     elif total_pixels < 1000000:
-        scale_factor = 2.5
         log_info("Medium image detected - using moderate upscaling")
+        return 2.5
     elif total_pixels > 4000000:
-        scale_factor = 0.7
         log_info("Large image detected - downscaling to optimize OCR")
+        return 0.7
+    log_info("Optimal size - using light upscaling")
+    return 1.5
+
+
+def _mask_runs(mask: np.ndarray) -> list:
+    padded = np.concatenate(([False], mask, [False]))
+    changes = np.flatnonzero(padded[1:] != padded[:-1])
+    return list(zip(changes[::2], changes[1::2]))
+
+
+def analyze_text_layout(gray: np.ndarray, estimate_skew: bool = False) -> dict | None:
+    height, width = gray.shape
+    factor = 1.0
+    if width * height > ANALYSIS_MAX_PIXELS:
+        factor = math.sqrt(ANALYSIS_MAX_PIXELS / (width * height))
+        small = cv2.resize(gray, (max(1, int(width * factor)), max(1, int(height * factor))),
+                           interpolation=cv2.INTER_AREA)
     else:
-        scale_factor = 1.5
-        log_info("Optimal size - using light upscaling")
-    
-    if scale_factor != 1.0:
-        new_size = (int(width * scale_factor), int(height * scale_factor))
-        image = image.resize(new_size, Image.Resampling.LANCZOS)
-        log_info(f"Resized image to {new_size}")
-    
-    img_array = np.array(image)
-    
-    if len(img_array.shape) == 3:
-        gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-    else:
-        gray = img_array
-    
-    denoised = cv2.fastNlMeansDenoising(gray, None, h=10, templateWindowSize=7, searchWindowSize=21)
-    
-    binary = cv2.adaptiveThreshold(
-        denoised, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-        cv2.THRESH_BINARY, 11, 2
+        small = gray
+
+    _, ink = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    light_background = cv2.countNonZero(ink) > ink.size // 2
+    if light_background:
+        cv2.bitwise_not(ink, dst=ink)
+
+    _, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    small_h, small_w = ink.shape
+    xs = stats[1:, cv2.CC_STAT_LEFT]
+    ys = stats[1:, cv2.CC_STAT_TOP]
+    widths = stats[1:, cv2.CC_STAT_WIDTH]
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    areas = stats[1:, cv2.CC_STAT_AREA]
+
+    glyphs = (
+        (heights >= 3) & (areas >= 4)
+        & (heights < small_h * 0.5) & (widths < small_w * 0.5)
+        & (widths <= heights * 4)
     )
-    
-    kernel = np.ones((1, 1), np.uint8)
-    morph = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
-    
-    processed_image = Image.fromarray(morph)
-    
-    contrast_enhancer = ImageEnhance.Contrast(processed_image)
-    processed_image = contrast_enhancer.enhance(1.5)
-    
-    sharpness_enhancer = ImageEnhance.Sharpness(processed_image)
-    processed_image = sharpness_enhancer.enhance(1.8)
-    
-    return processed_image
-
-
-def image_to_text(pil_image: Image.Image) -> str:
-    if not pil_image:
+    if np.count_nonzero(glyphs) < 3:
+        return None
+
+    glyph_height = float(np.median(heights[glyphs]))
+    text_glyphs = glyphs & (heights >= glyph_height * 0.4) & (heights <= glyph_height * 2.5)
+    xs, ys = xs[text_glyphs], ys[text_glyphs]
+    widths, heights = widths[text_glyphs], heights[text_glyphs]
+
+    rows = np.zeros(small_h, dtype=bool)
+    cols = np.zeros(small_w, dtype=bool)
+    for x, y, w, h in zip(xs, ys, widths, heights):
+        rows[y:y + h] = True
+        cols[x:x + w] = True
+
+    line_count = sum(1 for start, end in _mask_runs(rows) if end - start >= glyph_height * 0.5)
+    col_runs = _mask_runs(cols)
+    column_gaps = sum(
+        1 for (_, prev_end), (next_start, _) in zip(col_runs, col_runs[1:])
+        if next_start - prev_end > glyph_height * 2.5
+    )
+
+    margin = max(glyph_height, 8 * factor)
+    left = max(0, int((xs.min() - margin) / factor))
+    top = max(0, int((ys.min() - margin) / factor))
+    right = min(width, int(math.ceil(((xs + widths).max() + margin) / factor)))
+    bottom = min(height, int(math.ceil(((ys + heights).max() + margin) / factor)))
+
+    skew_angle = 0.0
+    if estimate_skew and line_count > 1:
+        centers = np.column_stack((xs + widths / 2, ys + heights / 2)).astype(np.float32)
+        corners = cv2.boxPoints(cv2.minAreaRect(centers))
+        edge = max((corners[1] - corners[0], corners[2] - corners[1]), key=lambda e: e[0] ** 2 + e[1] ** 2)
+        skew_angle = math.degrees(math.atan2(edge[1], edge[0]))
+        if skew_angle > 90:
+            skew_angle -= 180
+        elif skew_angle <= -90:
+            skew_angle += 180
+        if abs(skew_angle) > 45:
+            skew_angle = skew_angle - 90 if skew_angle > 0 else skew_angle + 90
+
+    return {
+        "text_height": glyph_height / factor,
+        "line_count": line_count,
+        "columns": column_gaps + 1,
+        "text_box": (left, top, right - left, bottom - top),
+        "skew_angle": skew_angle,
+        "light_background": light_background
+    }
+
+
+def crop_to_text(gray: np.ndarray, layout: dict) -> np.ndarray:
+    height, width = gray.shape
+    x, y, w, h = layout['text_box']
+    if w * h >= width * height * AUTO_CROP_MIN_SAVING:
+        return gray
+    log_info(f"Auto-crop: {width}x{height} -> {w}x{h} at ({x}, {y})")
+    return gray[y:y + h, x:x + w]
+
+
+def crop_origin(gray: np.ndarray, layout: dict) -> tuple:
+    height, width = gray.shape
+    x, y, w, h = layout['text_box']
+    if w * h >= width * height * AUTO_CROP_MIN_SAVING:
+        return 0, 0
+    return x, y
+
+
+def deskew(gray: np.ndarray, layout: dict) -> np.ndarray:
+    angle = layout['skew_angle']
+    max_angle = config.get('ocr_deskew_max_angle', 15)
+    if abs(angle) < 0.5 or abs(angle) > max_angle:
+        return gray
+
+    height, width = gray.shape
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    rotated = _buffer_pool.get('deskewed', gray.shape)
+    cv2.warpAffine(gray, matrix, (width, height), dst=rotated, flags=cv2.INTER_LINEAR,
+                   borderMode=cv2.BORDER_CONSTANT, borderValue=255 if layout['light_background'] else 0)
+    log_info(f"Deskewed capture by {angle:.2f} degrees")
+    return rotated
+
+
+def choose_scale_factor(layout: dict) -> float:
+    target_height = config.get('ocr_target_text_height', 28)
+    scale_factor = math.ceil(target_height / max(layout['text_height'], 1.0) * 4) / 4
+    scale_factor = min(max(scale_factor, 0.5), 3.0)
+    if 0.75 <= scale_factor < 1.0:
+        scale_factor = 1.0
+    return scale_factor
+
+
+def choose_psm(layout: dict | None) -> int:
+    forced_psm = config.get('ocr_psm', 'auto')
+    if forced_psm != 'auto':
+        return int(forced_psm)
+    if not layout or layout['columns'] > 1:
+        return 3
+    if layout['line_count'] == 1:
+        return 7
+    return 6
+
+
+def scale_for_ocr(gray: np.ndarray, scale_factor: float) -> np.ndarray:
+    height, width = gray.shape
+    if scale_factor == 1.0:
+        return np.ascontiguousarray(gray)
+
+    new_size = (max(1, int(width * scale_factor)), max(1, int(height * scale_factor)))
+    interpolation = cv2.INTER_LANCZOS4 if scale_factor > 1.0 else cv2.INTER_AREA
+    scaled = _buffer_pool.get('scaled', (new_size[1], new_size[0]))
+    cv2.resize(gray, new_size, dst=scaled, interpolation=interpolation)
+    log_info(f"Resized image to {new_size}")
+    return scaled
+
+
+def binarize_fast(scaled: np.ndarray, prefix: str = '') -> np.ndarray:
+    binary = _buffer_pool.get(prefix + 'fast_binary', scaled.shape)
+    cv2.threshold(scaled, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=binary)
+    return binary
+
+
+def binarize_heavy(scaled: np.ndarray, prefix: str = '', denoise: bool = True) -> np.ndarray:
+    denoised = scaled
+    if denoise:
+        denoised = _buffer_pool.get(prefix + 'denoised', scaled.shape)
+        cv2.fastNlMeansDenoising(scaled, dst=denoised, h=10, templateWindowSize=7, searchWindowSize=21)
+
+    binary = _buffer_pool.get(prefix + 'binary', scaled.shape)
+    cv2.adaptiveThreshold(
+        denoised, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+        cv2.THRESH_BINARY, 11, 2, dst=binary
+    )
+    return binary
+
+
+def preprocess_image_for_ocr(image, scale_factor: float | None = None) -> np.ndarray:
+    gray = _to_gray_array(image)
+    height, width = gray.shape
+    log_info(f"Preprocessing image for OCR: {width}x{height} ({width * height} pixels)")
+
+    if scale_factor is None:
+        scale_factor = pixel_count_scale_factor(width, height)
+
+    return binarize_heavy(scale_for_ocr(gray, scale_factor))
+
+
+def _ocr_input_path() -> str:
+    return os.path.join(tempfile.gettempdir(), f"quizsnapper_ocr_{os.getpid()}_{threading.get_ident()}.pgm")
+
+
+def _run_tesseract(buffer: np.ndarray, languages: str, tesseract_config: str, with_data: bool = False):
+    input_path = _ocr_input_path()
+    if not cv2.imwrite(input_path, buffer):
+        raise RuntimeError(f"Failed to write OCR input to {input_path}")
+    try:
+        if with_data:
+            return pytesseract.image_to_data(input_path, lang=languages, config=tesseract_config,
+                                             output_type=pytesseract.Output.DICT)
+        return pytesseract.image_to_string(input_path, lang=languages, config=tesseract_config)
+    finally:
+        try:
+            os.remove(input_path)
+        except OSError:
+            pass
+
+
+def _group_lines(data: dict) -> list:
+    lines = {}
+    for i, word in enumerate(data['text']):
+        word = word.strip()
+        confidence = float(data['conf'][i])
+        if not word or confidence < 0:
+            continue
+
+        key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+        left, top = data['left'][i], data['top'][i]
+        right, bottom = left + data['width'][i], top + data['height'][i]
+        line = lines.get(key)
+        if line is None:
+            line = lines[key] = {"words": [], "box": [left, top, right, bottom]}
+        line['words'].append((word, left, top, right, bottom, confidence))
+        box = line['box']
+        box[0], box[1] = min(box[0], left), min(box[1], top)
+        box[2], box[3] = max(box[2], right), max(box[3], bottom)
+
+    result = []
+    for key in sorted(lines):
+        line = lines[key]
+        result.append({
+            "key": key,
+            "text": ' '.join(word[0] for word in line['words']),
+            "confidence": sum(word[5] for word in line['words']) / len(line['words']),
+            "box": tuple(line['box']),
+            "words": line['words']
+        })
+    return result
+
+
+def _shift_line(line: dict, dx: float, dy: float) -> dict:
+    left, top, right, bottom = line['box']
+    return {
+        **line,
+        "box": (int(left + dx), int(top + dy), int(right + dx), int(bottom + dy)),
+        "words": [(text, int(l + dx), int(t + dy), int(r + dx), int(b + dy), conf)
+                  for text, l, t, r, b, conf in line['words']]
+    }
+
+
+def _lines_to_text(lines: list) -> str:
+    parts = []
+    previous_paragraph = None
+    for line in lines:
+        paragraph = line['key'][:-1]
+        if previous_paragraph is not None and paragraph != previous_paragraph:
+            parts.append('')
+        parts.append(line['text'])
+        previous_paragraph = paragraph
+    return '\n'.join(parts)
+
+
+def _heavy_pass_mode(deadline: Deadline | None) -> tuple:
+    """(run heavy pass, denoise) given how much of the capture's time budget is left."""
+    if deadline is None:
+        return True, True
+    pressure = deadline.pressure('ocr_heavy', 'ai_request')
+    if pressure > DROP_HEAVY_OCR_PRESSURE:
+        deadline.degrade('drop_heavy_ocr', f"pressure {pressure:.1f}")
+        return False, False
+    if pressure > SKIP_DENOISE_PRESSURE:
+        deadline.degrade('skip_denoise', f"pressure {pressure:.1f}")
+        return True, False
+    return True, True
+
+
+def _escalate_line(scaled: np.ndarray, line: dict, languages: str, denoise: bool = True) -> dict:
+    left, top, right, bottom = line['box']
+    pad = max(4, (bottom - top) // 2)
+    height, width = scaled.shape
+    crop_left, crop_top = max(0, left - pad), max(0, top - pad)
+    crop = np.ascontiguousarray(scaled[crop_top:min(height, bottom + pad),
+                                       crop_left:min(width, right + pad)])
+
+    data = _run_tesseract(binarize_heavy(crop, prefix='line_', denoise=denoise), languages, '--oem 3 --psm 7',
+                          with_data=True)
+    retried = _group_lines(data)
+    if not retried:
+        return line
+
+    words = [word for entry in retried for word in _shift_line(entry, crop_left, crop_top)['words']]
+    confidence = sum(word[5] for word in words) / len(words)
+    if confidence <= line['confidence']:
+        return line
+    return {**line, "text": ' '.join(word[0] for word in words), "confidence": confidence, "words": words}
+
+
+def _cascade_lines(scaled: np.ndarray, languages: str, tesseract_config: str,
+                   deadline: Deadline | None = None, fast_data: dict | None = None) -> list | None:
+    min_confidence = config.get('ocr_min_confidence', 75)
+    max_escalated_ratio = config.get('ocr_max_escalated_line_ratio', 0.5)
+
+    data = fast_data or _run_tesseract(binarize_fast(scaled), languages, tesseract_config, with_data=True)
+    lines = _group_lines(data)
+    low_lines = [index for index, line in enumerate(lines) if line['confidence'] < min_confidence]
+    if lines and not low_lines:
+        log_info(f"Fast OCR pass accepted ({len(lines)} lines)")
+        return lines
+
+    run_heavy, denoise = _heavy_pass_mode(deadline)
+    if not run_heavy:
+        log_info(f"Fast OCR pass kept without escalation ({len(lines)} lines) to meet the deadline")
+        return lines
+
+    if not lines:
+        log_info("Fast OCR pass found no text, escalating to full preprocessing")
+        return None
+
+    if len(low_lines) > len(lines) * max_escalated_ratio:
+        log_info(f"Fast OCR pass: {len(low_lines)}/{len(lines)} lines below {min_confidence}%, "
+                 f"escalating to full preprocessing")
+        return None
+
+    log_info(f"Fast OCR pass: re-reading {len(low_lines)}/{len(lines)} low-confidence lines")
+    for index in low_lines:
+        lines[index] = _escalate_line(scaled, lines[index], languages, denoise)
+    return lines
+
+
+def _recognize_lines(scaled: np.ndarray, languages: str, tesseract_config: str, region: tuple | None,
+                     deadline: Deadline | None = None, fast: bool = False, fast_data: dict | None = None) -> tuple:
+    """fast_data: an Otsu pass over the whole of scaled (e.g. the language probe) to use instead of running one."""
+    if fast:
+        data = fast_data or _run_tesseract(binarize_fast(scaled), languages, tesseract_config, with_data=True)
+        return _group_lines(data), languages
+
+    lines = None
+    if config.get('ocr_cascade', True):
+        lines = _cascade_lines(scaled, languages, tesseract_config, deadline, fast_data)
+    if lines is None:
+        run_heavy, denoise = _heavy_pass_mode(deadline)
+        if not run_heavy:
+            data = fast_data or _run_tesseract(binarize_fast(scaled), languages, tesseract_config, with_data=True)
+            return _group_lines(data), languages
+
+        configured_languages = config.get('ocr_lang', 'eng')
+        if languages != configured_languages:
+            log_info(f"Low confidence with narrowed languages, using full set: {configured_languages}")
+            languages = configured_languages
+            cache_languages(region, configured_languages, configured_languages)
+        start = time.perf_counter()
+        data = _run_tesseract(binarize_heavy(scaled, denoise=denoise), languages, tesseract_config, with_data=True)
+        lines = _group_lines(data)
+        if deadline is not None and denoise:
+            deadline.record('ocr_heavy', time.perf_counter() - start)
+    return lines, languages
+
+
+def plan_tiles(scaled_height: int, scaled_width: int, budget_bytes: int, overlap: int) -> list:
+    tile_height = int(budget_bytes / max(scaled_width * OCR_BYTES_PER_PIXEL, 1))
+    if tile_height >= scaled_height:
+        return [(0, scaled_height, 0, scaled_height)]
+
+    tile_height = max(tile_height, overlap * 4)
+    tiles = []
+    start = 0
+    while True:
+        end = min(start + tile_height, scaled_height)
+        own_start = 0 if start == 0 else start + overlap // 2
+        own_end = scaled_height if end == scaled_height else end - overlap // 2
+        tiles.append((start, end, own_start, own_end))
+        if end == scaled_height:
+            return tiles
+        start += tile_height - overlap
+
+
+def _tiled_lines(gray: np.ndarray, scale_factor: float, tiles: list, psm: int, region: tuple | None,
+                 deadline: Deadline | None = None, fast: bool = False) -> list:
+    height = gray.shape[0]
+    tesseract_config = f'--oem 3 --psm {psm}'
+    languages = None
+    all_lines = []
+
+    for index, (start, end, own_start, own_end) in enumerate(tiles):
+        source_start = int(start / scale_factor)
+        source_end = min(height, int(math.ceil(end / scale_factor)))
+        offset = source_start * scale_factor
+        tile = scale_for_ocr(gray[source_start:source_end], scale_factor)
+
+        probe_data = None
+        if languages is None:
+            if fast:
+                languages = config.get('ocr_lang', 'eng')
+            else:
+                languages, probe_data = select_languages(tile, psm, region)
+            log_info(f"Performing tiled OCR ({len(tiles)} tiles) with languages: {languages}, psm {psm}")
+
+        lines, languages = _recognize_lines(tile, languages, tesseract_config, region, deadline, fast, probe_data)
+        for line in lines:
+            center = offset + (line['box'][1] + line['box'][3]) / 2
+            if own_start <= center < own_end:
+                line = _shift_line(line, 0, offset)
+                line['key'] = (index,) + line['key']
+                all_lines.append(line)
+
+    return all_lines
+
+
+def _probe_languages(scaled: np.ndarray, configured: str, psm: int) -> tuple:
+    height, width = scaled.shape
+    rows = max(1, min(height, LANGUAGE_PROBE_MAX_PIXELS // max(width, 1)))
+    probe = np.ascontiguousarray(scaled[:rows])
+    data = _run_tesseract(binarize_fast(probe, prefix='probe_'), configured, f'--oem 3 --psm {psm}', with_data=True)
+    languages = narrow_languages(_lines_to_text(_group_lines(data)), configured)
+    return languages, data if rows == height else None
+
+
+def select_languages(scaled: np.ndarray, psm: int, region: tuple | None = None) -> tuple:
+    """(languages, probe data); the probe data is returned only when the probe read the whole frame,
+    so the cascade can use it as its fast pass instead of reading the frame again."""
+    configured = config.get('ocr_lang', 'eng')
+    if '+' not in configured or not config.get('ocr_auto_language', True):
+        return configured, None
+
+    cached = get_cached_languages(region, configured)
+    if cached:
+        log_info(f"Using cached OCR languages for this region: {cached}")
+        return cached, None
+
+    languages, probe_data = _probe_languages(scaled, configured, psm)
+    cache_languages(region, configured, languages)
+    return languages, probe_data
+
+
+def _result_cache_key(gray: np.ndarray, fast: bool) -> tuple:
+    digest = hashlib.blake2b(np.ascontiguousarray(gray).data, digest_size=16).hexdigest()
+    settings = tuple(config.get(key) for key in (
+        'ocr_lang', 'ocr_psm', 'ocr_auto_crop', 'ocr_deskew', 'ocr_adaptive_scaling', 'ocr_cascade'))
+    return (digest, gray.shape, fast) + settings
+
+
+def image_to_ocr_result(image, region: tuple | None = None, deadline: Deadline | None = None,
+                        fast: bool = False) -> OCRResult:
+    """Tesseract OCR of a capture; fast=True keeps the single Otsu pass (no language probe or escalation)."""
+    if image is None:
         log_error("No image provided")
-        return ""
+        return OCRResult()
 
     try:
-        preprocessed_image = preprocess_image_for_ocr(pil_image)
-        languages = config.get('ocr_lang', 'eng')
-        log_info(f"Performing OCR with languages: {languages}")
-        
-        custom_config = r'--oem 3 --psm 3'
-        text = pytesseract.image_to_string(preprocessed_image, lang=languages, config=custom_config)
-        
-        log_info(f"OCR extracted {len(text)} characters")
-        if text:
-            log_info(f"OCR preview: {text[:150]}...")
-        return text.strip()
+        _buffer_pool.reset_peak()
+        gray = _to_gray_array(image)
+        height, width = gray.shape
+        cache_key = _result_cache_key(gray, fast)
+        cached = _result_cache.get(cache_key)
+        if cached is not None:
+            log_info(f"Using cached OCR result for this capture ({len(cached)} words)")
+            return cached
+        log_info(f"Preprocessing image for OCR: {width}x{height} ({width * height} pixels)")
+
+        use_layout = config.get('ocr_adaptive_scaling', True) or config.get('ocr_auto_crop', True)
+        layout = analyze_text_layout(gray, estimate_skew=config.get('ocr_deskew', False)) if use_layout else None
+        origin = (0, 0)
+        content_key = None
+        if layout and config.get('ocr_auto_crop', True):
+            origin = crop_origin(gray, layout)
+            gray = crop_to_text(gray, layout)
+            content_key = _result_cache_key(gray, fast)
+            cached = _content_cache.get(content_key)
+            if cached is not None:
+                result = cached[0].shifted(origin[0] - cached[1][0], origin[1] - cached[1][1])
+                _result_cache.put(cache_key, result)
+                log_info(f"Reusing OCR of the unchanged text area ({len(result)} words)")
+                return result
+        if layout and config.get('ocr_deskew', False):
+            gray = deskew(gray, layout)
+
+        if layout and config.get('ocr_adaptive_scaling', True):
+            scale_factor = choose_scale_factor(layout)
+            log_info(f"Text layout: glyph height {layout['text_height']:.1f}px, {layout['line_count']} lines, "
+                     f"{layout['columns']} columns -> scale {scale_factor}")
+        else:
+            scale_factor = pixel_count_scale_factor(gray.shape[1], gray.shape[0])
+
+        psm = choose_psm(layout)
+        budget_bytes = int(config.get('ocr_memory_budget_mb', 0) * 1024 * 1024)
+        scaled_height = int(gray.shape[0] * scale_factor)
+        scaled_width = int(gray.shape[1] * scale_factor)
+        overlap = int(layout['text_height'] * scale_factor * 3) if layout else 96
+        tiles = plan_tiles(scaled_height, scaled_width, budget_bytes, overlap) if budget_bytes > 0 else None
+
+        if tiles and len(tiles) > 1:
+            lines = _tiled_lines(gray, scale_factor, tiles, psm, region, deadline, fast)
+            languages = config.get('ocr_lang', 'eng')
+        else:
+            scaled = scale_for_ocr(gray, scale_factor)
+            probe_data = None
+            if fast:
+                languages = config.get('ocr_lang', 'eng')
+            else:
+                languages, probe_data = select_languages(scaled, psm, region)
+            log_info(f"Performing {'fast ' if fast else ''}OCR with languages: {languages}, psm {psm}"
+                     + (" (reusing the language probe as the fast pass)" if probe_data else ""))
+            lines, languages = _recognize_lines(scaled, languages, f'--oem 3 --psm {psm}', region, deadline, fast,
+                                                probe_data)
+        result = OCRResult.from_lines(lines, scale_factor, origin, languages, psm)
+        if not (deadline and deadline.degradations):
+            _result_cache.put(cache_key, result)
+            if content_key is not None:
+                _content_cache.put(content_key, (result, origin))
+
+        peak_bytes = _buffer_pool.peak_bytes() + gray.nbytes
+        log_info(f"OCR peak buffer memory: {peak_bytes / 1024 / 1024:.1f} MB"
+                 + (f" (budget {budget_bytes / 1024 / 1024:.0f} MB, {len(tiles)} tiles)" if tiles else ""))
+        if budget_bytes > 0 and _buffer_pool.total_bytes() > budget_bytes // 2:
+            _buffer_pool.release()
+
+        log_info(f"OCR extracted {len(result.text)} characters, {len(result)} words "
+                 f"(mean confidence {result.mean_confidence:.0f})")
+        if result.text:
+            log_info(f"OCR preview: {result.text[:150]}...")
+        return result
     except pytesseract.TesseractNotFoundError:
         log_error("Tesseract not found. Please install and add to PATH.")
-        raise RuntimeError("TesseractNotFoundError") 
+        raise RuntimeError("TesseractNotFoundError")
     except Exception as e:
         log_error(f"OCR error: {e}", exc_info=True)
-        return ""
\ No newline at end of file
+        return OCRResult()
+
+
+def clear_result_cache():
+    _result_cache.clear()
+    _content_cache.clear()
+
+
+def image_to_text(image, region: tuple | None = None) -> str:
+    return image_to_ocr_result(image, region).text
+
+
+def measure_preprocess_allocations(image, runs: int = 5) -> list:
+    peaks = []
+    for _ in range(runs):
+        tracemalloc.start()
+        preprocess_image_for_ocr(image)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peaks.append(peak)
+    return peaks
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python -m src.ocr <image> [runs]")
+        sys.exit(1)
+
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    with Image.open(sys.argv[1]) as source:
+        source_image = source.convert('RGB')
+
+    peaks = measure_preprocess_allocations(source_image, runs)
+    print(f"Preprocessing peak allocations over {runs} runs:")
+    for index, peak in enumerate(peaks, 1):
+        print(f"  run {index}: {peak / 1024 / 1024:.2f} MB")
+    print(f"\nOCR text:\n{image_to_text(source_image)}")
@@ -0,0 +1,280 @@
+import difflib
+import os
+import threading
+import time
+import tracemalloc
+import numpy as np
+import cv2
+
+from .config_manager import config
+from .deadline import Deadline
+from .ocr import OCRResult, image_to_ocr_result, _to_gray_array, _mask_runs, analyze_text_layout
+from .utils import log_info, log_error, log_warning
+
+
+class OCREngine:
+    """Recognizes a capture into an OCRResult (boxes in capture coordinates)."""
+    name = "base"
+
+    def is_available(self) -> bool:
+        return True
+
+    def recognize(self, image, region: tuple | None = None, deadline: Deadline | None = None) -> OCRResult:
+        raise NotImplementedError
+
+
+class TesseractOCREngine(OCREngine):
+    name = "tesseract"
+
+    def recognize(self, image, region: tuple | None = None, deadline: Deadline | None = None) -> OCRResult:
+        return image_to_ocr_result(image, region=region, deadline=deadline)
+
+
+class TesseractFastOCREngine(OCREngine):
+    name = "tesseract_fast"
+
+    def recognize(self, image, region: tuple | None = None, deadline: Deadline | None = None) -> OCRResult:
+        return image_to_ocr_result(image, region=region, deadline=deadline, fast=True)
+
+
+class OnnxOCREngine(OCREngine):
+    """CTC text-line recognizer (e.g. a PaddleOCR/CRNN export) run with onnxruntime on the CPU.
+
+    Lines and words are segmented with projection profiles; each word crop goes through
+    the model and is decoded greedily with index 0 as the CTC blank and charset[i - 1]
+    for the other classes.
+    """
+    name = "onnx"
+
+    def __init__(self):
+        import onnxruntime
+
+        model_path = config.get('ocr_onnx_model_path', '')
+        charset_path = config.get('ocr_onnx_charset_path', '')
+        if not model_path or not os.path.isfile(model_path):
+            raise FileNotFoundError(f"ONNX model not found: {model_path or '(ocr_onnx_model_path not set)'}")
+        if not charset_path or not os.path.isfile(charset_path):
+            raise FileNotFoundError(f"ONNX charset not found: {charset_path or '(ocr_onnx_charset_path not set)'}")
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = config.get('ocr_onnx_threads', 0)
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        shape = model_input.shape
+        self.channels = shape[1] if isinstance(shape[1], int) else 3
+        self.input_height = shape[2] if isinstance(shape[2], int) else config.get('ocr_onnx_input_height', 48)
+
+        with open(charset_path, 'r', encoding='utf-8') as f:
+            self.charset = [line.rstrip('\n') for line in f]
+        if ' ' not in self.charset:
+            self.charset.append(' ')
+        log_info(f"ONNX OCR model loaded: {model_path} ({len(self.charset)} characters, "
+                 f"input {self.channels}x{self.input_height})")
+
+    @staticmethod
+    def _segment(ink: np.ndarray) -> list:
+        lines = []
+        for top, bottom in _mask_runs(ink.any(axis=1)):
+            height = bottom - top
+            if height < 4:
+                continue
+            columns = ink[top:bottom].any(axis=0)
+            gap = max(3, int(height * 0.5))
+            merged = cv2.dilate(columns.astype(np.uint8)[None, :], np.ones((1, gap), np.uint8))[0] > 0
+            words = []
+            for left, right in _mask_runs(merged):
+                filled = np.flatnonzero(columns[left:right])
+                if len(filled):
+                    words.append((left + filled[0], left + filled[-1] + 1))
+            lines.append((top, bottom, words))
+        return lines
+
+    def _recognize_crop(self, crop: np.ndarray) -> tuple:
+        height, width = crop.shape
+        target_width = max(8, min(config.get('ocr_onnx_max_width', 1600),
+                                  int(round(width * self.input_height / height))))
+        resized = cv2.resize(crop, (target_width, self.input_height), interpolation=cv2.INTER_LINEAR)
+        tensor = (resized.astype(np.float32) / 255.0 - 0.5) / 0.5
+        tensor = np.repeat(tensor[None, None], self.channels, axis=1)
+
+        scores = self.session.run(None, {self.input_name: tensor})[0][0]
+        if scores.min() < 0 or not np.allclose(scores.sum(axis=-1), 1.0, atol=1e-2):
+            scores = np.exp(scores - scores.max(axis=-1, keepdims=True))
+            scores /= scores.sum(axis=-1, keepdims=True)
+
+        indices = scores.argmax(axis=-1)
+        best = scores.max(axis=-1)
+        characters, confidences = [], []
+        previous = 0
+        for index, score in zip(indices, best):
+            if index != 0 and index != previous and index - 1 < len(self.charset):
+                characters.append(self.charset[index - 1])
+                confidences.append(score)
+            previous = index
+        text = ''.join(characters).strip()
+        return text, float(np.mean(confidences) * 100) if confidences else 0.0
+
+    def recognize(self, image, region: tuple | None = None, deadline: Deadline | None = None) -> OCRResult:
+        gray = _to_gray_array(image).copy()
+        layout = analyze_text_layout(gray)
+        if layout and not layout['light_background']:
+            gray = 255 - gray
+        _, ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+
+        lines = []
+        for line_index, (top, bottom, spans) in enumerate(self._segment(ink)):
+            words = []
+            for left, right in spans:
+                pad = 2
+                crop = gray[max(0, top - pad):bottom + pad, max(0, left - pad):right + pad]
+                text, confidence = self._recognize_crop(crop)
+                if text:
+                    words.append((text, int(left), int(top), int(right), int(bottom), confidence))
+            if words:
+                lines.append({
+                    "key": (1, 1, line_index + 1),
+                    "text": ' '.join(word[0] for word in words),
+                    "confidence": sum(word[5] for word in words) / len(words),
+                    "box": (words[0][1], top, words[-1][3], bottom),
+                    "words": words
+                })
+
+        result = OCRResult.from_lines(lines, 1.0, (0, 0), 'onnx', None)
+        log_info(f"ONNX OCR extracted {len(result.text)} characters, {len(result)} words "
+                 f"(mean confidence {result.mean_confidence:.0f})")
+        return result
+
+
+OCR_ENGINES = {
+    "tesseract": TesseractOCREngine,
+    "tesseract_fast": TesseractFastOCREngine,
+    "onnx": OnnxOCREngine,
+}
+
+_engine_instances = {}
+_engine_lock = threading.Lock()
+
+
+def get_engine(name: str) -> OCREngine | None:
+    with _engine_lock:
+        if name not in _engine_instances:
+            engine_class = OCR_ENGINES.get(name)
+            if engine_class is None:
+                log_error(f"Unknown OCR engine: {name}")
+                return None
+            try:
+                _engine_instances[name] = engine_class()
+            except Exception as e:
+                log_warning(f"OCR engine '{name}' failed to initialize: {e}")
+                _engine_instances[name] = None
+        engine = _engine_instances[name]
+    if engine is None or not engine.is_available():
+        return None
+    return engine
+
+
+def recognize(image, region: tuple | None = None, deadline: Deadline | None = None) -> OCRResult:
+    """OCR with the engine selected by ocr_engine, falling back to Tesseract."""
+    name = config.get('ocr_engine', 'tesseract')
+    engine = get_engine(name)
+    if engine is None:
+        if name != 'tesseract':
+            log_warning(f"OCR engine '{name}' unavailable, using tesseract")
+        engine = get_engine('tesseract')
+    return engine.recognize(image, region=region, deadline=deadline)
+
+
+def image_to_text(image, region: tuple | None = None) -> str:
+    return recognize(image, region).text
+
+
+def _rss_bytes() -> int | None:
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+def _similarity(text: str, expected: str) -> float:
+    return difflib.SequenceMatcher(None, ' '.join(text.split()), ' '.join(expected.split())).ratio()
+
+
+def compare_engines(image_paths: list, engines: list, runs: int = 3) -> dict:
+    """Latency, memory and accuracy of each engine over the same images.
+
+    Accuracy is the character similarity to <image>.gt.txt when that file exists.
+    Memory is the tracemalloc peak (Python and numpy allocations) plus the process RSS
+    growth when psutil is installed; native engine arenas only show up in the latter.
+    """
+    from PIL import Image
+    from . import ocr
+
+    images = []
+    for path in image_paths:
+        with Image.open(path) as source:
+            image = source.convert('RGB')
+        ground_truth = path.with_suffix('.gt.txt')
+        expected = ground_truth.read_text(encoding='utf-8') if ground_truth.exists() else None
+        images.append((image, expected))
+
+    results = {}
+    for name in engines:
+        engine = get_engine(name)
+        if engine is None:
+            results[name] = None
+            continue
+        timings, scores, peaks = [], [], []
+        rss_before = _rss_bytes()
+        for image, expected in images:
+            engine.recognize(image)
+            for _ in range(runs):
+                ocr.clear_result_cache()
+                tracemalloc.start()
+                start = time.perf_counter()
+                result = engine.recognize(image)
+                timings.append((time.perf_counter() - start) * 1000)
+                peaks.append(tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+            if expected is not None:
+                scores.append(_similarity(result.text, expected))
+        rss_after = _rss_bytes()
+
+        timings.sort()
+        results[name] = {
+            "mean_ms": sum(timings) / len(timings),
+            "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+            "peak_mb": max(peaks) / 1024 / 1024,
+            "rss_growth_mb": (rss_after - rss_before) / 1024 / 1024 if rss_before is not None else None,
+            "accuracy": sum(scores) / len(scores) if scores else None,
+        }
+    return results
+
+
+if __name__ == '__main__':
+    import argparse
+    from pathlib import Path
+    from .batch import find_images
+
+    parser = argparse.ArgumentParser(description="Compare OCR engines on the same images.")
+    parser.add_argument('input', help="Image file or folder (ground truth in <image>.gt.txt)")
+    parser.add_argument('--engines', nargs='+', choices=sorted(OCR_ENGINES), default=list(OCR_ENGINES))
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    input_path = Path(args.input)
+    paths = find_images(input_path) if input_path.is_dir() else [input_path]
+    if not paths:
+        parser.error(f"No images found in {input_path}")
+
+    print(f"{len(paths)} images, {args.runs} runs per image\n")
+    print(f"{'engine':<16}{'mean ms':>10}{'p95 ms':>10}{'peak MB':>10}{'RSS +MB':>10}{'accuracy':>10}")
+    for engine_name, stats in compare_engines(paths, args.engines, args.runs).items():
+        if stats is None:
+            print(f"{engine_name:<16}{'unavailable':>30}")
+            continue
+        rss = f"{stats['rss_growth_mb']:.1f}" if stats['rss_growth_mb'] is not None else "n/a"
+        accuracy = f"{stats['accuracy']:.1%}" if stats['accuracy'] is not None else "n/a"
+        print(f"{engine_name:<16}{stats['mean_ms']:>10.1f}{stats['p95_ms']:>10.1f}"
+              f"{stats['peak_mb']:>10.1f}{rss:>10}{accuracy:>10}")
@@ -0,0 +1,89 @@
+import re
+from .utils import LRUCache, log_info
+
+STOPWORDS = {
+    "eng": {
+        "the", "of", "and", "to", "in", "is", "that", "for", "it", "as", "with", "was", "on", "are", "be",
+        "by", "this", "which", "or", "from", "an", "not", "what", "following", "true", "false", "select",
+        "all", "answer", "question", "choose", "does", "can", "these", "when", "how", "why", "who",
+    },
+    "ita": {
+        "il", "di", "che", "la", "e", "un", "per", "non", "una", "sono", "del", "della", "le", "si", "con",
+        "da", "gli", "al", "nel", "dei", "delle", "quale", "quali", "vero", "falso", "seleziona", "risposta",
+        "domanda", "tra", "come", "cosa", "questo", "questa", "degli", "alla", "sulla", "anche", "è",
+    },
+    "fra": {
+        "le", "la", "les", "de", "des", "du", "et", "est", "un", "une", "que", "qui", "pour", "dans", "en",
+        "pas", "sur", "au", "aux", "avec", "ce", "cette", "vrai", "faux", "réponse", "question", "quel",
+        "quelle", "sont", "être", "ou", "par", "il", "elle",
+    },
+    "deu": {
+        "der", "die", "das", "und", "ist", "nicht", "ein", "eine", "zu", "den", "mit", "von", "auf", "für",
+        "im", "dem", "des", "sich", "auch", "welche", "welcher", "richtig", "falsch", "antwort", "frage",
+        "wählen", "sie", "oder", "wird", "sind", "es",
+    },
+    "spa": {
+        "el", "la", "de", "que", "y", "en", "los", "las", "un", "una", "es", "por", "con", "para", "del",
+        "se", "no", "al", "lo", "como", "cuál", "cual", "verdadero", "falso", "respuesta", "pregunta",
+        "seleccione", "son", "más", "o",
+    },
+    "por": {
+        "o", "a", "de", "que", "e", "do", "da", "em", "um", "uma", "para", "com", "não", "os", "as", "dos",
+        "das", "no", "na", "por", "qual", "quais", "verdadeiro", "falso", "resposta", "pergunta",
+        "selecione", "são", "é", "ou",
+    },
+}
+
+_WORD_PATTERN = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+_language_cache = LRUCache(64)
+REGION_GRID = 50
+
+
+def score_languages(text: str, languages: list) -> dict:
+    words = [word.lower() for word in _WORD_PATTERN.findall(text)]
+    scores = {}
+    for language in languages:
+        stopwords = STOPWORDS.get(language)
+        if stopwords is not None:
+            scores[language] = sum(1 for word in words if word in stopwords)
+    return scores
+
+
+def narrow_languages(probe_text: str, configured: str, min_hits: int = 3, dominance: float = 2.0) -> str:
+    languages = configured.split('+')
+    if len(languages) < 2:
+        return configured
+
+    scores = score_languages(probe_text, languages)
+    unscored = [language for language in languages if language not in scores]
+    if len(scores) < 2:
+        return configured
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    best_language, best_score = ranked[0]
+    runner_up_score = ranked[1][1]
+    if best_score < min_hits or best_score < runner_up_score * dominance:
+        return configured
+
+    log_info(f"Language probe scores {scores} -> using {best_language}")
+    return '+'.join([best_language] + unscored)
+
+
+def region_key(region: tuple | None, configured: str):
+    if region is None:
+        return None
+    x, y, w, h = region
+    return (configured, x // REGION_GRID, y // REGION_GRID, w // REGION_GRID, h // REGION_GRID)
+
+
+def get_cached_languages(region: tuple | None, configured: str) -> str | None:
+    key = region_key(region, configured)
+    return _language_cache.get(key) if key is not None else None
+
+
+def cache_languages(region: tuple | None, configured: str, languages: str):
+    key = region_key(region, configured)
+    if key is not None:
+        _language_cache.put(key, languages)
+
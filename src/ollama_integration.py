@@ -4,8 +4,21 @@ import re
 import time
 from pathlib import Path
 from .config_manager import config
+from .question_types import classify_question, resolve_route, generation_options, answer_is_complete
+from .deadline import Deadline
+from .text_compaction import compact_for_prompt
+from .pdf_context import load_pdf_texts, OCR_CACHE_NAME
+from .qa_index import lookup_answer
 from .utils import log_info, log_error, log_warning
 
+_http_session = requests.Session()
+
+TRIM_KB_PRESSURE = 1.0
+SMALLER_MODEL_PRESSURE = 1.5
+CAP_TOKENS_PRESSURE = 2.0
+# A retry is only worth starting when at least this much of the capture budget is left.
+MIN_ATTEMPT_S = 1.0
+
 
 def load_pdf_context() -> str:
     knowledge_base_dir = Path(config.get('knowledge_base_folder', 'knowledge_base'))
@@ -20,22 +33,11 @@ def load_pdf_context() -> str:
         return ""
     
     try:
-        import PyPDF2
         context_parts = []
-        
-        for pdf_file in pdf_files:
-            try:
-                with open(pdf_file, 'rb') as f:
-                    reader = PyPDF2.PdfReader(f)
-                    text_parts = []
-                    for page in reader.pages:
-                        text_parts.append(page.extract_text())
-                    
-                    if text_parts:
-                        context_parts.append(f"Source: {pdf_file.name}\n{''.join(text_parts)}")
-                        log_info(f"Loaded PDF: {pdf_file.name}")
-            except Exception as e:
-                log_warning(f"Failed to read PDF {pdf_file.name}: {e}")
+        for name, text in load_pdf_texts(sorted(pdf_files), knowledge_base_dir / OCR_CACHE_NAME):
+            if text.strip():
+                context_parts.append(f"Source: {name}\n{text}")
+                log_info(f"Loaded PDF: {name}")
         
         return "\n\n---\n\n".join(context_parts) if context_parts else ""
     
@@ -128,13 +130,51 @@ def clean_ai_output(raw_response: str) -> str:
     return result
 
 
-def get_ai_response(text_from_ocr: str) -> str:
+def warm_up_model() -> bool:
+    from .config_manager import load_config
+    current_config = load_config()
+    if current_config.get('ai_provider', 'ollama') != 'ollama':
+        return False
+
+    api_url = current_config.get('ollama_api_url', 'http://localhost:11434/api/generate')
+    model_name = current_config.get('ollama_model', 'deepseek-r1:1.5b')
+    payload = {
+        "model": model_name,
+        "prompt": "",
+        "keep_alive": current_config.get('ollama_keep_alive', '5m')
+    }
+
+    try:
+        response = _http_session.post(api_url, json=payload, timeout=120)
+        response.raise_for_status()
+        log_info(f"Ollama model '{model_name}' loaded and kept warm")
+        return True
+    except requests.exceptions.RequestException as e:
+        log_warning(f"Could not warm up Ollama model '{model_name}': {e}")
+        return False
+
+
+def get_ai_response(text_from_ocr: str, question_type: str | None = None, deadline: Deadline | None = None,
+                    model: str | None = None) -> str:
+    """Answer for OCR text; model sends it to that Ollama model instead of the configured route."""
     if not text_from_ocr:
         log_error("No OCR text provided to AI")
         return "No text was extracted from the screenshot."
     
     log_info(f"OCR Input ({len(text_from_ocr)} chars): {text_from_ocr[:200]}...")
-    raw_response = _get_response_from_ai_provider(text_from_ocr)
+    text_from_ocr = compact_for_prompt(text_from_ocr) or text_from_ocr
+    if config.get('qa_fast_path_enabled', True):
+        match = lookup_answer(text_from_ocr)
+        if match:
+            log_info(f"Answered from Q&A knowledge base ({match['source']}, match {match['score']:.0%}): "
+                     f"{match['question'][:100]}")
+            return match['answer']
+    if question_type is None and (config.get('model_routing_enabled', False) or config.get('generation_limits')):
+        question_type = classify_question(text_from_ocr)
+    start = time.perf_counter()
+    raw_response = _get_response_from_ai_provider(text_from_ocr, question_type, deadline, model)
+    if deadline is not None and not raw_response.startswith("Error:"):
+        deadline.record('ai_request', time.perf_counter() - start)
     log_info(f"Raw AI Response: {raw_response[:300]}...")
     
     cleaned = clean_ai_output(raw_response)
@@ -143,10 +183,11 @@ def get_ai_response(text_from_ocr: str) -> str:
     return cleaned
 
 
-def _get_response_from_ai_provider(text_from_ocr: str) -> str:
+def _get_response_from_ai_provider(text_from_ocr: str, question_type: str | None = None,
+                                   deadline: Deadline | None = None, model: str | None = None) -> str:
     """Handle AI API call with optional PDF context."""
-    provider = config.get('ai_provider', 'ollama')
-    log_info(f"Using AI provider: {provider}")
+    route = {"provider": 'ollama', "model": model} if model else resolve_route(question_type, config)
+    provider = route['provider']
 
     pdf_context = ""
     if config.get('use_pdf_context', False):
@@ -154,19 +195,79 @@ def _get_response_from_ai_provider(text_from_ocr: str) -> str:
         if pdf_context:
             log_info("PDF context loaded successfully")
 
+    max_tokens = None
+    timeout = 60
+    if deadline is not None:
+        pressure = deadline.pressure('ai_request')
+        kb_max_chars = config.get('deadline_kb_max_chars', 4000)
+        if pressure > TRIM_KB_PRESSURE and len(pdf_context) > kb_max_chars:
+            pdf_context = pdf_context[:kb_max_chars]
+            deadline.degrade('trim_kb_context', f"{kb_max_chars} chars")
+        fallback_model = config.get('deadline_fallback_model')
+        if pressure > SMALLER_MODEL_PRESSURE and fallback_model and provider == 'ollama':
+            route['model'] = fallback_model
+            deadline.degrade('smaller_model', fallback_model)
+        if pressure > CAP_TOKENS_PRESSURE:
+            max_tokens = config.get('deadline_max_tokens', 64)
+            deadline.degrade('cap_tokens', f"{max_tokens} tokens")
+        timeout = max(1.0, deadline.remaining())
+
+    log_info(f"Using AI provider: {provider}, model: {route['model']}"
+             + (f" (question type: {question_type})" if question_type else ""))
+
     if provider == 'ollama':
-        return _call_ollama(text_from_ocr, pdf_context)
+        return _call_ollama(text_from_ocr, pdf_context, route['model'], question_type, max_tokens, timeout, deadline)
     elif provider == 'api':
-        return _call_external_api(text_from_ocr, pdf_context)
+        return _call_external_api(text_from_ocr, pdf_context, route['model'], question_type, max_tokens, timeout,
+                                  deadline)
     else:
         return f"Error: Unknown AI provider '{provider}'"
 
 
-def _call_ollama(text_from_ocr: str, pdf_context: str = "") -> str:
+def _can_retry(attempt: int, max_retries: int, retry_delay: float, deadline: Deadline | None) -> bool:
+    """Whether another attempt fits, counting the pause before it against the capture deadline."""
+    if attempt >= max_retries - 1:
+        return False
+    return deadline is None or deadline.remaining() >= retry_delay + MIN_ATTEMPT_S
+
+
+def _attempt_timeout(attempt: int, timeout: float, deadline: Deadline | None) -> float | None:
+    """Request timeout for this attempt from the time left, or None when a retry no longer fits."""
+    if deadline is None:
+        return timeout
+    remaining = deadline.remaining()
+    if attempt and remaining < MIN_ATTEMPT_S:
+        return None
+    return max(MIN_ATTEMPT_S, remaining)
+
+
+def _read_ollama_stream(response, question_type: str | None, early_stop: bool) -> tuple:
+    parts = []
+    data = {}
+    try:
+        for line in response.iter_lines():
+            if not line:
+                continue
+            data = json.loads(line)
+            parts.append(data.get("response", ""))
+            if data.get("done"):
+                break
+            if early_stop and answer_is_complete(''.join(parts), question_type):
+                log_info(f"Complete {question_type} answer received, stopping generation early")
+                data = {**data, "done_reason": "early_stop"}
+                break
+    finally:
+        response.close()
+    return ''.join(parts), data
+
+
+def _call_ollama(text_from_ocr: str, pdf_context: str = "", model_name: str | None = None,
+                 question_type: str | None = None, max_tokens: int | None = None, timeout: float = 60,
+                 deadline: Deadline | None = None) -> str:
     from .config_manager import load_config
     current_config = load_config()
     api_url = current_config.get('ollama_api_url', 'http://localhost:11434/api/generate')
-    model_name = current_config.get('ollama_model', 'deepseek-r1:1.5b')
+    model_name = model_name or current_config.get('ollama_model', 'deepseek-r1:1.5b')
     prompt_template = current_config.get('prompt_template', 
         "Answer the following question based on your knowledge.\n\nQuestion: [TEXT]")
     
@@ -186,22 +287,45 @@ def _call_ollama(text_from_ocr: str, pdf_context: str = "") -> str:
     if pdf_context:
         prompt = f"Use the following reference material to answer the question:\n\n{pdf_context}\n\n{prompt}"
     
+    limits = generation_options(question_type, current_config)
+    if max_tokens:
+        limits['max_tokens'] = min(limits['max_tokens'] or max_tokens, max_tokens)
+    early_stop = current_config.get('stream_early_stop', True) and not show_explanation
     payload = {
         "model": model_name,
         "prompt": prompt,
-        "stream": False
+        "stream": early_stop,
+        "keep_alive": current_config.get('ollama_keep_alive', '5m'),
+        "options": {}
     }
+    if limits['max_tokens']:
+        payload['options']['num_predict'] = limits['max_tokens']
+    if limits['stop']:
+        payload['options']['stop'] = limits['stop']
+    if current_config.get('suppress_thinking', True):
+        payload['think'] = False
     
     max_retries = 3
     retry_delay = 2
     
     for attempt in range(max_retries):
+        attempt_timeout = _attempt_timeout(attempt, timeout, deadline)
+        if attempt_timeout is None:
+            return "Error: Ollama request timed out"
         try:
-            response = requests.post(api_url, json=payload, timeout=60)
+            response = _http_session.post(api_url, json=payload, timeout=attempt_timeout, stream=early_stop)
             response.raise_for_status()
-            data = response.json()
+            if early_stop:
+                ai_text, data = _read_ollama_stream(response, question_type, early_stop)
+            else:
+                data = response.json()
+                ai_text = data.get("response", "No response from Ollama")
             
-            ai_text = data.get("response", "No response from Ollama")
+            if data.get("done_reason") == "length" and '<think>' in ai_text and '</think>' not in ai_text \
+                    and 'num_predict' in payload['options']:
+                log_warning("Output limit reached while the model was still thinking, retrying without limit")
+                payload['options'].pop('num_predict')
+                continue
             
             ai_text = re.sub(r'<\|.*?\|>', '', ai_text)
             ai_text = re.sub(r'<think>.*?</think>', '', ai_text, flags=re.DOTALL)
@@ -216,18 +340,22 @@ def _call_ollama(text_from_ocr: str, pdf_context: str = "") -> str:
             return ai_text.strip()
         
         except requests.exceptions.ConnectionError:
-            if attempt < max_retries - 1:
+            if _can_retry(attempt, max_retries, retry_delay, deadline):
                 log_warning(f"Ollama connection failed, retrying ({attempt + 1}/{max_retries})...")
                 time.sleep(retry_delay)
                 continue
             return f"Error: Cannot connect to Ollama at {api_url}. Is it running?"
         except requests.exceptions.Timeout:
-            if attempt < max_retries - 1:
+            if _can_retry(attempt, max_retries, retry_delay, deadline):
                 log_warning(f"Ollama timeout, retrying ({attempt + 1}/{max_retries})...")
                 time.sleep(retry_delay)
                 continue
             return "Error: Ollama request timed out"
         except requests.exceptions.HTTPError as e:
+            if e.response.status_code == 400 and 'think' in payload:
+                log_warning("Ollama rejected the think option, retrying without thinking suppression")
+                payload.pop('think')
+                continue
             return f"Error: Ollama API error {e.response.status_code}"
         except Exception as e:
             log_error(f"Ollama error: {e}", exc_info=True)
@@ -236,12 +364,14 @@ def _call_ollama(text_from_ocr: str, pdf_context: str = "") -> str:
     return "Error: Maximum retries exceeded"
 
 
-def _call_external_api(text_from_ocr: str, pdf_context: str = "") -> str:
+def _call_external_api(text_from_ocr: str, pdf_context: str = "", model_name: str | None = None,
+                       question_type: str | None = None, max_tokens: int | None = None, timeout: float = 60,
+                       deadline: Deadline | None = None) -> str:
     from .config_manager import load_config
     current_config = load_config()
     api_url = current_config.get('api_url')
     api_key = current_config.get('api_key')
-    model_name = current_config.get('api_model')
+    model_name = model_name or current_config.get('api_model')
     prompt_template = current_config.get('prompt_template',
         "Answer the following question based on your knowledge.\n\nQuestion: [TEXT]")
     
@@ -270,6 +400,13 @@ def _call_external_api(text_from_ocr: str, pdf_context: str = "") -> str:
         "messages": [{"role": "user", "content": prompt_content}],
         "stream": False
     }
+    limits = generation_options(question_type, current_config)
+    if max_tokens:
+        limits['max_tokens'] = min(limits['max_tokens'] or max_tokens, max_tokens)
+    if limits['max_tokens']:
+        payload['max_tokens'] = limits['max_tokens']
+    if limits['stop']:
+        payload['stop'] = limits['stop'][:4]
     
     headers = {
         "Authorization": f"Bearer {api_key}",
@@ -280,8 +417,11 @@ def _call_external_api(text_from_ocr: str, pdf_context: str = "") -> str:
     retry_delay = 2
     
     for attempt in range(max_retries):
+        attempt_timeout = _attempt_timeout(attempt, timeout, deadline)
+        if attempt_timeout is None:
+            return "Error: API request timed out"
         try:
-            response = requests.post(api_url, json=payload, headers=headers, timeout=60)
+            response = _http_session.post(api_url, json=payload, headers=headers, timeout=attempt_timeout)
             response.raise_for_status()
             data = response.json()
             
@@ -301,19 +441,19 @@ def _call_external_api(text_from_ocr: str, pdf_context: str = "") -> str:
             return ai_text.strip()
         
         except requests.exceptions.ConnectionError:
-            if attempt < max_retries - 1:
+            if _can_retry(attempt, max_retries, retry_delay, deadline):
                 log_warning(f"API connection failed, retrying ({attempt + 1}/{max_retries})...")
                 time.sleep(retry_delay)
                 continue
             return f"Error: Cannot connect to API at {api_url}"
         except requests.exceptions.Timeout:
-            if attempt < max_retries - 1:
+            if _can_retry(attempt, max_retries, retry_delay, deadline):
                 log_warning(f"API timeout, retrying ({attempt + 1}/{max_retries})...")
                 time.sleep(retry_delay)
                 continue
             return "Error: API request timed out"
         except requests.exceptions.HTTPError as e:
-            if e.response.status_code >= 500 and attempt < max_retries - 1:
+            if e.response.status_code >= 500 and _can_retry(attempt, max_retries, retry_delay, deadline):
                 log_warning(f"API server error, retrying ({attempt + 1}/{max_retries})...")
                 time.sleep(retry_delay)
                 continue
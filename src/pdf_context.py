@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from .config_manager import config
+from .ocr_engines import image_to_text
+from .utils import log_info, log_warning
+
+OCR_CACHE_NAME = '.ocr_cache.json'
+
+# PDF path -> (file signature, page texts, OCR cache keys); documents are parsed once per version.
+_document_cache = {}
+_load_lock = threading.Lock()
+
+
+def _ocr_settings() -> str:
+    return json.dumps([config.get('ocr_engine', 'tesseract'), config.get('ocr_lang', 'eng'),
+                       config.get('pdf_ocr_dpi', 200)])
+
+
+def page_hash(page) -> str:
+    """Hash of what a page draws: its content stream, images and geometry."""
+    digest = hashlib.blake2b(digest_size=16)
+    contents = page.get_contents()
+    if contents is not None:
+        digest.update(contents.get_data())
+    digest.update(f"{page.get('/Rotate', 0)}:{list(page.mediabox)}".encode())
+
+    resources = page.get('/Resources')
+    xobjects = resources.get_object().get('/XObject') if resources is not None else None
+    if xobjects is not None:
+        xobjects = xobjects.get_object()
+        for name in sorted(xobjects):
+            digest.update(name.encode())
+            digest.update(xobjects[name].get_object().get_data())
+    return digest.hexdigest()
+
+
+def rasterize_page(pdf_path: str, page_index: int, dpi: int):
+    """Render a page with pypdfium2 when installed, else take the largest image embedded in it (the scan)."""
+    try:
+        import pypdfium2
+    except ImportError:
+        pypdfium2 = None
+
+    if pypdfium2 is not None:
+        document = pypdfium2.PdfDocument(pdf_path)
+        try:
+            page = document[page_index]
+            image = page.render(scale=dpi / 72).to_pil()
+            page.close()
+            return image
+        finally:
+            document.close()
+
+    import PyPDF2
+    page = PyPDF2.PdfReader(pdf_path).pages[page_index]
+    images = [embedded.image for embedded in page.images]
+    if not images:
+        return None
+    image = max(images, key=lambda candidate: candidate.width * candidate.height)
+    rotation = page.get('/Rotate', 0) % 360
+    return image.rotate(-rotation, expand=True) if rotation else image
+
+
+def _ocr_page_worker(pdf_path: str, page_index: int, dpi: int) -> tuple:
+    start = time.perf_counter()
+    image = rasterize_page(pdf_path, page_index, dpi)
+    text = image_to_text(image.convert('RGB')) if image is not None else ""
+    return text, time.perf_counter() - start
+
+
+def _load_ocr_cache(cache_file: Path) -> dict:
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, json.JSONDecodeError) as e:
+        log_warning(f"Ignoring unreadable PDF OCR cache {cache_file}: {e}")
+        return {}
+
+
+def _save_ocr_cache(cache_file: Path, cache: dict):
+    temp_file = cache_file.with_suffix('.tmp')
+    try:
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(temp_file, cache_file)
+    except OSError as e:
+        log_warning(f"Failed to save PDF OCR cache {cache_file}: {e}")
+
+
+def _ocr_pages(pending: list, cache: dict) -> int:
+    """OCR (pdf_file, page_index, key) pages missing from the cache in worker processes; returns pages done."""
+    misses = [item for item in pending if item[2] not in cache]
+    if not misses:
+        return 0
+
+    workers = config.get('pdf_ocr_workers', 0) or max(1, (os.cpu_count() or 2) - 1)
+    workers = min(workers, len(misses))
+    dpi = config.get('pdf_ocr_dpi', 200)
+    log_info(f"OCR of {len(misses)} scanned PDF pages with {workers} worker processes")
+    start = time.perf_counter()
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_ocr_page_worker, str(pdf_file), index, dpi): (pdf_file, index, key)
+                   for pdf_file, index, key in misses}
+        for future in as_completed(futures):
+            pdf_file, index, key = futures[future]
+            try:
+                text, seconds = future.result()
+            except Exception as e:
+                log_warning(f"OCR failed for {pdf_file.name} page {index + 1}: {e}")
+                continue
+            cache[key] = text
+            done += 1
+            log_info(f"OCR of {pdf_file.name} page {index + 1}: {len(text)} characters in {seconds:.1f}s")
+    log_info(f"Scanned PDF pages done in {time.perf_counter() - start:.1f}s")
+    return done
+
+
+def load_pdf_texts(pdf_files: list, cache_file: Path) -> list:
+    """(file name, text) for each PDF; pages without a text layer are OCR'd and cached per page hash."""
+    import PyPDF2
+
+    ocr_enabled = config.get('pdf_ocr_enabled', True)
+    min_chars = config.get('pdf_ocr_min_chars', 20)
+    settings = _ocr_settings()
+
+    with _load_lock:
+        documents = {}
+        pending = []
+        incomplete = set()
+        for pdf_file in pdf_files:
+            stat = pdf_file.stat()
+            signature = (stat.st_mtime_ns, stat.st_size, settings, ocr_enabled, min_chars)
+            cached = _document_cache.get(pdf_file)
+            if cached and cached[0] == signature:
+                documents[pdf_file] = cached
+                continue
+
+            try:
+                reader = PyPDF2.PdfReader(str(pdf_file))
+                pages, keys = [], []
+                for index, page in enumerate(reader.pages):
+                    text = page.extract_text() or ''
+                    if ocr_enabled and len(text.strip()) < min_chars:
+                        try:
+                            content_hash = page_hash(page)
+                        except Exception as e:
+                            log_warning(f"Skipping OCR of {pdf_file.name} page {index + 1}: {e}")
+                        else:
+                            key = hashlib.blake2b(f"{content_hash}:{settings}".encode(), digest_size=16).hexdigest()
+                            keys.append((index, key))
+                            pending.append((pdf_file, index, key))
+                    pages.append(text)
+                documents[pdf_file] = (signature, pages, keys)
+            except Exception as e:
+                log_warning(f"Failed to read PDF {pdf_file.name}: {e}")
+
+        if pending:
+            cache = _load_ocr_cache(cache_file)
+            cached_before = len(cache)
+            ocr_done = _ocr_pages(pending, cache)
+            for pdf_file, index, key in pending:
+                if key not in cache:
+                    incomplete.add(pdf_file)
+                ocr_text = cache.get(key, '')
+                pages = documents[pdf_file][1]
+                if len(ocr_text.strip()) > len(pages[index].strip()):
+                    pages[index] = ocr_text
+
+            in_use = {key for _, _, keys in documents.values() for _, key in keys}
+            pruned = {key: text for key, text in cache.items() if key in in_use}
+            if ocr_done or len(pruned) != cached_before:
+                _save_ocr_cache(cache_file, pruned)
+            log_info(f"Scanned PDF pages: {len(pending) - ocr_done} from cache, {ocr_done} recognized")
+
+        results = []
+        for pdf_file in pdf_files:
+            document = documents.get(pdf_file)
+            if document is None:
+                continue
+            if pdf_file not in incomplete:
+                _document_cache[pdf_file] = document
+            results.append((pdf_file.name, ''.join(document[1])))
+        return results
@@ -0,0 +1,79 @@
+import cProfile
+import io
+import pstats
+import threading
+import time
+from pathlib import Path
+from .config_manager import load_config, save_config
+from .utils import log_info, log_error
+
+_counter_lock = threading.Lock()
+
+
+def request_profiling(runs: int | None = None) -> int:
+    """Profile the next `runs` workflow runs (profile_run_count when omitted)."""
+    current_config = load_config()
+    if runs is None:
+        runs = current_config.get('profile_run_count', 5)
+    current_config['profile_next_runs'] = max(0, runs)
+    save_config(current_config)
+    log_info(f"Profiling enabled for the next {runs} runs" if runs else "Profiling cancelled")
+    return runs
+
+
+def _claim_profiled_run() -> int | None:
+    """Take one profiled run off profile_next_runs; the runs left afterwards, or None when none was requested."""
+    with _counter_lock:
+        current_config = load_config()
+        remaining = current_config.get('profile_next_runs', 0)
+        if remaining <= 0:
+            return None
+        current_config['profile_next_runs'] = remaining - 1
+        save_config(current_config)
+        return remaining - 1
+
+
+def summarize_profile(profiler: cProfile.Profile, top: int) -> str:
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.strip_dirs().sort_stats('cumulative').print_stats(top)
+    stream.write("\n")
+    stats.sort_stats('tottime').print_stats(top)
+    return stream.getvalue()
+
+
+def run_profiled(func, *args, on_last_run=None, **kwargs):
+    """Call func, profiling it when profile_next_runs is above zero.
+
+    on_last_run is called once the countdown reaches zero, e.g. to clear a menu check mark.
+    cProfile follows the calling thread only; time spent in worker threads shows up
+    as waiting in the caller.
+    """
+    remaining = _claim_profiled_run()
+    if remaining is None:
+        return func(*args, **kwargs)
+    if remaining == 0 and on_last_run is not None:
+        on_last_run()
+
+    current_config = load_config()
+    output_dir = Path(current_config.get('profile_output_folder', 'profiles'))
+    top = current_config.get('profile_top_functions', 25)
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - start
+        try:
+            output_dir.mkdir(parents=True, exist_ok=True)
+            base = output_dir / f"{func.__name__.strip('_')}_{time.strftime('%Y%m%d_%H%M%S')}"
+            profiler.dump_stats(f"{base}.prof")
+            summary = summarize_profile(profiler, top)
+            with open(f"{base}.txt", 'w', encoding='utf-8') as f:
+                f.write(summary)
+            log_info(f"Profiled run took {elapsed:.2f}s; profile saved to {base}.prof, "
+                     f"top {top} functions in {base}.txt")
+        except OSError as e:
+            log_error(f"Failed to save profile: {e}")
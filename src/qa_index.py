@@ -0,0 +1,281 @@
+import csv
+import json
+import re
+import threading
+import unicodedata
+from collections import Counter
+from difflib import SequenceMatcher
+from pathlib import Path
+
+from .config_manager import config
+from .question_types import is_option
+from .text_compaction import compact_ocr_text
+from .utils import log_info, log_warning
+
+QA_EXTENSIONS = {'.csv', '.json', '.md'}
+QUESTION_COLUMNS = ("question", "q", "front", "domanda", "prompt")
+ANSWER_COLUMNS = ("answer", "a", "back", "risposta", "response")
+MIN_QUESTION_CHARS = 8
+FUZZY_CANDIDATES = 20
+# Words that flip what a question asks; a fuzzy match must use the same ones as the stored question.
+POLARITY_WORDS = frozenset((
+    "not", "no", "never", "none", "nor", "neither", "except", "false", "incorrect", "wrong", "untrue",
+    "non", "without", "least", "most", "cannot", "isn", "aren", "doesn", "don", "wasn", "weren", "won",
+    "tranne", "eccetto", "falso", "falsa", "sbagliato", "sbagliata", "errato", "errata", "mai",
+    "nessun", "nessuno", "nessuna", "senza",
+))
+
+_NUMBER_PREFIX = re.compile(r'^(?:(?:question|domanda|q)\s*)?\d+\s*[.):]\s*', re.IGNORECASE)
+_MD_QUESTION = re.compile(r'^\s*(?:[-*]\s*)?(?:\*\*)?(?:q|question|d|domanda)\s*[:.](?:\*\*)?\s*(.*)$', re.IGNORECASE)
+_MD_ANSWER = re.compile(r'^\s*(?:[-*]\s*)?(?:\*\*)?(?:a|answer|r|risposta)\s*[:.](?:\*\*)?\s*(.*)$', re.IGNORECASE)
+_MD_HEADING = re.compile(r'^#{1,6}\s+(.+?)\s*#*\s*$')
+_OPTION_LABEL = re.compile(r'^\s*(?:\(?([a-hA-H])[.)]\s+|[○◯●◉□☐■•\-*©]\s*|O\s+(?=\S))')
+
+
+def normalize_question(text: str) -> str:
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    text = _NUMBER_PREFIX.sub('', text.strip())
+    return ' '.join(re.sub(r'[^\w\s]', ' ', text).split())
+
+
+def _answer_text(value) -> str:
+    if isinstance(value, list):
+        return '\n'.join(str(item).strip() for item in value)
+    return str(value).strip()
+
+
+def _split_option(line: str) -> tuple:
+    """(lowercase letter label or None, normalized text) of an option or answer line."""
+    match = _OPTION_LABEL.match(line)
+    label = match.group(1) if match else None
+    text = normalize_question(line[match.end():] if match else line)
+    if label is None and len(text) == 1 and text in 'abcdefgh':
+        return text, ''
+    return label.lower() if label else None, text
+
+
+def _answer_among_options(answer: str, options: list) -> bool:
+    """Whether every line of a stored answer names one of the (label, text) options on screen."""
+    found = False
+    for line in answer.split('\n'):
+        label, text = _split_option(line)
+        if not label and not text:
+            continue
+        if not any((text and (text == option_text or (len(text) >= 3 and text in option_text)))
+                   or (label and not text and label == option_label)
+                   for option_label, option_text in options):
+            return False
+        found = True
+    return found
+
+
+def _polarity(key: str) -> frozenset:
+    return POLARITY_WORDS.intersection(key.split())
+
+
+def _pick_column(fieldnames: list, candidates: tuple) -> str | None:
+    lowered = {name.strip().lower(): name for name in fieldnames if name}
+    return next((lowered[name] for name in candidates if name in lowered), None)
+
+
+def _load_csv(path: Path) -> list:
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        rows = list(csv.reader(f, dialect))
+    if not rows:
+        return []
+
+    question_column = _pick_column(rows[0], QUESTION_COLUMNS)
+    answer_column = _pick_column(rows[0], ANSWER_COLUMNS)
+    if question_column is not None and answer_column is not None:
+        question_index, answer_index = rows[0].index(question_column), rows[0].index(answer_column)
+        rows = rows[1:]
+    else:
+        question_index, answer_index = 0, 1
+    return [(row[question_index], row[answer_index]) for row in rows
+            if len(row) > max(question_index, answer_index)]
+
+
+def _load_json(path: Path) -> list:
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        return [(question, _answer_text(answer)) for question, answer in data.items()]
+
+    pairs = []
+    for item in data if isinstance(data, list) else []:
+        if not isinstance(item, dict):
+            continue
+        question_key = _pick_column(list(item), QUESTION_COLUMNS)
+        answer_key = _pick_column(list(item), ANSWER_COLUMNS)
+        if question_key and answer_key:
+            pairs.append((str(item[question_key]), _answer_text(item[answer_key])))
+    return pairs
+
+
+def _load_markdown(path: Path) -> list:
+    """Q:/A: line pairs, or headings ending in '?' followed by the answer text."""
+    pairs = []
+    question, answer_lines, mode = None, [], None
+
+    def flush():
+        if question and answer_lines:
+            pairs.append((question, '\n'.join(answer_lines).strip()))
+
+    for line in path.read_text(encoding='utf-8').splitlines():
+        heading = _MD_HEADING.match(line)
+        question_match = _MD_QUESTION.match(line)
+        answer_match = _MD_ANSWER.match(line)
+        if heading:
+            flush()
+            text = heading.group(1).strip()
+            question, answer_lines, mode = (text, [], 'answer') if text.endswith('?') else (None, [], None)
+        elif question_match:
+            flush()
+            question, answer_lines, mode = question_match.group(1).strip(), [], 'question'
+        elif answer_match and question:
+            answer_lines, mode = [answer_match.group(1).strip()], 'answer'
+        elif line.strip() and mode == 'question':
+            question += ' ' + line.strip()
+        elif line.strip() and mode == 'answer':
+            answer_lines.append(line.strip())
+    flush()
+    return pairs
+
+
+_LOADERS = {'.csv': _load_csv, '.json': _load_json, '.md': _load_markdown}
+
+
+def find_qa_files(folder: Path) -> list:
+    return sorted(path for path in folder.glob('*')
+                  if path.is_file() and path.suffix.lower() in QA_EXTENSIONS and not path.name.startswith('.'))
+
+
+class QAIndex:
+    """Question/answer pairs with exact lookup on normalized text and fuzzy lookup over shared words."""
+
+    def __init__(self):
+        self.entries = []
+        self.exact = {}
+        self.postings = {}
+
+    def add(self, question: str, answer: str, source: str) -> bool:
+        key = normalize_question(question)
+        if len(key) < MIN_QUESTION_CHARS or not answer or key in self.exact:
+            return False
+        entry_id = len(self.entries)
+        self.entries.append({"question": question.strip(), "answer": answer, "source": source, "key": key})
+        self.exact[key] = entry_id
+        for token in set(key.split()):
+            self.postings.setdefault(token, []).append(entry_id)
+        return True
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _fuzzy(self, key: str, threshold: float) -> tuple:
+        shared = Counter()
+        for token in set(key.split()):
+            shared.update(self.postings.get(token, ()))
+
+        best_id, best_score = None, 0.0
+        for entry_id, _ in shared.most_common(FUZZY_CANDIDATES):
+            matcher = SequenceMatcher(None, key, self.entries[entry_id]['key'], autojunk=False)
+            if matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold:
+                continue
+            score = matcher.ratio()
+            if score > best_score:
+                best_id, best_score = entry_id, score
+        return best_id, best_score
+
+    def lookup(self, text: str, threshold: float) -> dict | None:
+        lines = [line for line in compact_ocr_text(text).split('\n') if line.strip()]
+        stem = []
+        for line in lines:
+            if stem and is_option(line):
+                break
+            stem.append(line)
+
+        # A match also fits other questions sharing the wording, so with options on screen
+        # it only counts when the stored answer is one of them.
+        options = [_split_option(line) for line in lines[len(stem):]]
+        variants = [' '.join(stem)] + ([' '.join(lines)] if options else [])
+
+        best_id, best_score = None, 0.0
+        for variant in variants:
+            key = normalize_question(variant)
+            if len(key) < MIN_QUESTION_CHARS:
+                continue
+            entry_id, score = (self.exact[key], 1.0) if key in self.exact else self._fuzzy(key, threshold)
+            if entry_id is None or score <= best_score:
+                continue
+            entry = self.entries[entry_id]
+            if score < 1.0 and _polarity(key) != _polarity(entry['key']):
+                continue
+            if options and not _answer_among_options(entry['answer'], options):
+                continue
+            best_id, best_score = entry_id, score
+
+        if best_id is None or best_score < threshold:
+            return None
+        return {**self.entries[best_id], "score": best_score}
+
+
+def build_index(files: list) -> QAIndex:
+    index = QAIndex()
+    for path in files:
+        try:
+            pairs = _LOADERS[path.suffix.lower()](path)
+        except (OSError, ValueError, UnicodeDecodeError, csv.Error) as e:
+            log_warning(f"Failed to read Q&A file {path.name}: {e}")
+            continue
+        added = sum(1 for question, answer in pairs if index.add(question, answer, path.name))
+        log_info(f"Q&A index: {added} of {len(pairs)} pairs from {path.name}")
+    return index
+
+
+_index = None
+_index_signature = None
+_index_lock = threading.Lock()
+
+
+def get_qa_index() -> QAIndex:
+    """The index for knowledge_base_folder, rebuilt when a Q&A file is added, removed or changed."""
+    global _index, _index_signature
+    folder = Path(config.get('knowledge_base_folder', 'knowledge_base'))
+    files = find_qa_files(folder) if folder.is_dir() else []
+    signature = tuple((str(path), path.stat().st_mtime_ns, path.stat().st_size) for path in files)
+    with _index_lock:
+        if _index is None or signature != _index_signature:
+            _index = build_index(files)
+            _index_signature = signature
+            if files:
+                log_info(f"Q&A index ready: {len(_index)} questions from {len(files)} files")
+        return _index
+
+
+def lookup_answer(text: str) -> dict | None:
+    """Stored answer for text when it matches an indexed question at or above qa_match_threshold."""
+    index = get_qa_index()
+    if not len(index):
+        return None
+    return index.lookup(text, config.get('qa_match_threshold', 0.9))
+
+
+if __name__ == '__main__':
+    import sys
+
+    qa_index = get_qa_index()
+    print(f"{len(qa_index)} questions indexed from {config.get('knowledge_base_folder', 'knowledge_base')}")
+    if len(sys.argv) > 1:
+        match = qa_index.lookup(' '.join(sys.argv[1:]), 0.0)
+        if match:
+            print(f"Best match ({match['score']:.0%}, {match['source']}): {match['question']}\nAnswer: {match['answer']}")
+        else:
+            print("No match")
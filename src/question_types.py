@@ -0,0 +1,113 @@
+import re
+
+QUESTION_TYPES = ("true_false", "single_choice", "multi_select", "match", "open")
+
+OPTION_LINE = re.compile(
+    r'^\s*(?:\(?[a-hA-H][\.\)]\s|[○◯●◉□☐■•\-\*©]\s*|O\s+(?=\S)|(?i:true|false|vero|falso)\s*$)')
+_TRUE_FALSE_OPTION = re.compile(r'^\W*(?:true|false|vero|falso|richtig|falsch|vrai|faux|verdadero)\W*$', re.IGNORECASE)
+_TRUE_FALSE_HINT = re.compile(r'\b(?:true or false|true/false|vero o falso|vero/falso)\b', re.IGNORECASE)
+_MULTI_SELECT_HINT = re.compile(
+    r'\b(?:select all|choose all|check all|mark all|all that apply|select (?:two|three|four|\d)|'
+    r'choose (?:two|three|four|\d)|seleziona tutte|scegli (?:due|tre)|tutte le risposte)\b|\(select \d\)|[☐□]',
+    re.IGNORECASE)
+_MATCH_HINT = re.compile(r'\b(?:match|matching|pair|pairs|abbina|associa|collega)\b', re.IGNORECASE)
+_PAIR_LINE = re.compile(r'^\s*[A-H1-9][\.\)]?\s*.+?\s(?:→|->)\s*.+$')
+
+
+def is_option(line: str) -> bool:
+    return bool(OPTION_LINE.match(line))
+
+
+def classify_question(text: str) -> str:
+    """Cheap question-type guess from OCR text, used to route the question to a model."""
+    lines = [line.strip() for line in text.split('\n') if line.strip()]
+    options = [line for line in lines if is_option(line)]
+
+    if _MATCH_HINT.search(text) or sum(1 for line in lines if _PAIR_LINE.match(line)) >= 3:
+        return "match"
+    if _TRUE_FALSE_HINT.search(text):
+        return "true_false"
+    tf_options = [line for line in lines if _TRUE_FALSE_OPTION.match(re.sub(r'^[○◯●◉□☐■•\-\*©O]\s*', '', line))]
+    if len(tf_options) >= 2 and len(options) <= len(tf_options) + 1:
+        return "true_false"
+    if _MULTI_SELECT_HINT.search(text):
+        return "multi_select"
+    if len(options) >= 2:
+        return "single_choice"
+    return "open"
+
+
+def resolve_route(question_type: str | None, current_config: dict) -> dict:
+    """Provider and model for a question type; falls back to ai_provider and its configured model."""
+    provider = current_config.get('ai_provider', 'ollama')
+    route = {}
+    if question_type and current_config.get('model_routing_enabled', False):
+        route = current_config.get('model_routes', {}).get(question_type) or {}
+    provider = route.get('provider', provider)
+    default_model = current_config.get('ollama_model' if provider == 'ollama' else 'api_model')
+    return {"provider": provider, "model": route.get('model') or default_model}
+
+
+def generation_options(question_type: str | None, current_config: dict) -> dict:
+    """Output cap and stop sequences for a question type; explanations get explanation_max_tokens."""
+    limits = current_config.get('generation_limits', {}).get(question_type or 'open') or {}
+    if current_config.get('show_explanation', True):
+        return {"max_tokens": current_config.get('explanation_max_tokens'), "stop": []}
+    return {"max_tokens": limits.get('max_tokens'), "stop": list(limits.get('stop', []))}
+
+
+_THINK_BLOCK = re.compile(r'<think>.*?</think>', re.DOTALL)
+_ANSWER_LINE = re.compile(r'^\W*(?:true|false|vero|falso)\b', re.IGNORECASE)
+_LEAD_IN_LINE = re.compile(
+    r'^\W*(?:(?:the\s+)?(?:correct\s+|right\s+|final\s+|best\s+)?(?:answer|option|choice)s?(?:\s+(?:is|are|would\s+be))?'
+    r'|(?:la\s+)?risposta(?:\s+(?:corretta|giusta))?(?:\s+è)?)\W*$', re.IGNORECASE)
+_PAIR_ARROW = re.compile(r'→|->')
+
+
+def _is_answer_line(line: str) -> bool:
+    """Non-empty and not a lead-in such as 'The correct answer is:'."""
+    return bool(line) and not line.endswith(':') and not _LEAD_IN_LINE.match(line)
+
+
+def _holds_answer_line(text: str) -> bool:
+    """A finished line with answer text."""
+    return any(_is_answer_line(line.strip()) for line in text.split('\n')[:-1])
+
+
+def _holds_option_list(text: str) -> bool:
+    """A blank line after at least one finished answer line."""
+    answered = False
+    for line in text.split('\n')[:-1]:
+        line = line.strip()
+        if not line and answered:
+            return True
+        answered = answered or _is_answer_line(line)
+    return False
+
+
+def _holds_pair_list(text: str) -> bool:
+    """A finished line that is not a pair after at least one pair; blank lines between pairs are skipped."""
+    paired = False
+    for line in text.split('\n')[:-1]:
+        line = line.strip()
+        if _PAIR_ARROW.search(line):
+            paired = True
+        elif paired and line:
+            return True
+    return False
+
+
+def answer_is_complete(text: str, question_type: str | None) -> bool:
+    """Whether a partially streamed answer (without explanation) already holds the full answer."""
+    if '<think>' in text and '</think>' not in text:
+        return False
+    text = _THINK_BLOCK.sub('', text).lstrip()
+    if question_type == 'true_false':
+        return bool(_ANSWER_LINE.match(text)) and ('\n' in text or text.rstrip().endswith('.'))
+    if question_type == 'single_choice':
+        return _holds_answer_line(text)
+    if question_type == 'multi_select':
+        return _holds_option_list(text)
+    if question_type == 'match':
+        return _holds_pair_list(text)
+    return False
@@ -0,0 +1,118 @@
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .config_manager import config
+from .ollama_integration import get_ai_response
+from .question_types import is_option
+from .utils import log_info, log_error
+
+_NUMBERED_LINE = re.compile(
+    r'^\s*(?:(?:question|domanda|frage|pregunta|q)\s*)?(\d{1,3})\s*(?:[\.\):]|\s+of\s+\d+)', re.IGNORECASE)
+
+
+def _looks_like_question(lines: list, numbered: bool) -> bool:
+    options = [index for index, line in enumerate(lines) if is_option(line)]
+    stem = lines[:options[0]] if options else lines
+    return any('?' in line for line in stem) or (numbered and len(options) >= 2)
+
+
+def _add_segment(segments: list, lines: list, number: int | None):
+    if segments and not _looks_like_question(lines, number is not None):
+        segments[-1][0].extend(lines)
+    else:
+        segments.append((lines, number))
+
+
+def split_questions(text: str, max_questions: int | None = None) -> list:
+    """Split OCR text holding several questions into one text per question.
+
+    A new question starts at the next number in sequence ("2.", "Question 2") or at a
+    non-option line following a block of options. Pieces that turn out not to be a
+    question (wrapped option text, numbered options) are merged into the previous one.
+    """
+    if max_questions is None:
+        max_questions = config.get('multi_question_max', 10)
+
+    segments = []
+    current = []
+    current_number = None
+    option_count = 0
+
+    for line in text.split('\n'):
+        stripped = line.strip()
+        if not stripped:
+            if current:
+                current.append('')
+            continue
+
+        option_line = is_option(stripped)
+        numbered = None if option_line else _NUMBERED_LINE.match(stripped)
+        number = int(numbered.group(1)) if numbered else None
+        if number is not None:
+            last_number = next((n for _, n in reversed(segments) if n is not None), None)
+            previous = [n for n in (last_number, current_number) if n is not None]
+            if previous and number - 1 not in previous:
+                number = None
+        starts_question = number is not None or (not option_line and option_count >= 2)
+
+        if starts_question and current:
+            _add_segment(segments, current, current_number)
+            current = []
+            option_count = 0
+        if starts_question:
+            current_number = number
+
+        current.append(stripped)
+        if option_line:
+            option_count += 1
+
+    if current:
+        _add_segment(segments, current, current_number)
+
+    if len(segments) > max_questions:
+        log_info(f"Found {len(segments)} questions, more than multi_question_max ({max_questions}); "
+                 f"answering as one")
+        return [text.strip()]
+
+    return ['\n'.join(lines).strip() for lines, _ in segments]
+
+
+def answer_questions(questions: list, on_answer=None, max_workers: int | None = None, deadline=None) -> list:
+    """Answer questions concurrently; on_answer(answers) is called with the partial list after each one."""
+    if max_workers is None:
+        max_workers = config.get('multi_question_concurrency', 3)
+    max_workers = max(1, min(max_workers, len(questions)))
+    log_info(f"Answering {len(questions)} questions with concurrency {max_workers}")
+
+    answers = [None] * len(questions)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(get_ai_response, question, None, deadline): index for index, question in enumerate(questions)}
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                answers[index] = future.result()
+            except Exception as e:
+                log_error(f"Question {index + 1} failed: {e}", exc_info=True)
+                answers[index] = f"Error: {e}"
+            log_info(f"Question {index + 1}/{len(questions)} answered")
+            if on_answer:
+                on_answer(list(answers))
+    return answers
+
+
+def format_answers(answers: list) -> str:
+    parts = []
+    for index, answer in enumerate(answers, 1):
+        parts.append(f"Question {index}:\n{answer if answer is not None else '...'}")
+    return '\n\n'.join(parts)
+
+
+if __name__ == '__main__':
+    sample = """1. Which planet is known as the Red Planet?
+a) Venus
+b) Mars
+c) Jupiter
+2. Water boils at 100 degrees Celsius at sea level.
+True
+False"""
+    for number, question in enumerate(split_questions(sample), 1):
+        print(f"--- Question {number} ---\n{question}")
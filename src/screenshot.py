@@ -1,18 +1,46 @@
 import tkinter as tk
-from PIL import ImageGrab
-import pyautogui
+import threading
+from .capture_backends import grab_region
+from .config_manager import config
+from .speculative_ocr import SpeculativeOCR
+from .utils import log_info, log_error
 
 
 class ScreenRegionSelector:
-    def __init__(self):
+    def __init__(self, parent_tk_root):
+        self.parent_tk_root = parent_tk_root
         self.root = None
         self.overlay = None
         self.start_x = None
         self.start_y = None
         self.rect = None
         self.region = None
+        self.speculative = None
+        self._drag_end = None
+        self._pause_after_id = None
+        self.selection_done = threading.Event()
+        self.selection_done.set()
+        self._build_overlay()
+
+    def _build_overlay(self):
+        self.root = tk.Toplevel(self.parent_tk_root)
+        self.root.withdraw()
+        self.root.attributes("-fullscreen", True)
+        self.root.attributes("-alpha", 0.3)
+        self.root.attributes("-topmost", True)
+        self.screen_size = (self.root.winfo_screenwidth(), self.root.winfo_screenheight())
+
+        self.overlay = tk.Canvas(self.root, cursor="cross", bg="gray10", highlightthickness=0)
+        self.overlay.pack(fill=tk.BOTH, expand=True)
+
+        self.overlay.bind("<ButtonPress-1>", self._on_mouse_press)
+        self.overlay.bind("<B1-Motion>", self._on_mouse_drag)
+        self.overlay.bind("<ButtonRelease-1>", self._on_mouse_release)
+        self.root.bind("<Escape>", self._on_cancel)
+        self.root.protocol("WM_DELETE_WINDOW", self._on_cancel)
 
     def _on_mouse_press(self, event):
+        self._cancel_pause_timer()
         self.start_x = self.overlay.canvasx(event.x)
         self.start_y = self.overlay.canvasy(event.y)
         if self.rect:
@@ -24,79 +52,152 @@ class ScreenRegionSelector:
         cur_y = self.overlay.canvasy(event.y)
         if self.start_x is not None and self.start_y is not None:
             if self.rect:
-                self.overlay.delete(self.rect)
-            self.rect = self.overlay.create_rectangle(
-                self.start_x, self.start_y, cur_x, cur_y,
-                outline='#00FF00', width=3
-            )
+                self.overlay.coords(self.rect, self.start_x, self.start_y, cur_x, cur_y)
+            else:
+                self.rect = self.overlay.create_rectangle(
+                    self.start_x, self.start_y, cur_x, cur_y,
+                    outline='#00FF00', width=3
+                )
+            if self.speculative:
+                self._drag_end = (cur_x, cur_y)
+                self._cancel_pause_timer()
+                self._pause_after_id = self.root.after(
+                    config.get('speculative_ocr_pause_ms', 250), self._on_drag_pause)
+
+    def _on_drag_pause(self):
+        self._pause_after_id = None
+        if self.speculative and self._drag_end and self.start_x is not None:
+            region = self._region_between(self.start_x, self.start_y, *self._drag_end)
+            if region:
+                self.speculative.submit(region)
+
+    def _cancel_pause_timer(self):
+        if self._pause_after_id is not None:
+            self.root.after_cancel(self._pause_after_id)
+            self._pause_after_id = None
+
+    def _region_between(self, x_a, y_a, x_b, y_b):
+        x1, y1 = max(0, min(x_a, x_b)), max(0, min(y_a, y_b))
+        x2, y2 = min(self.screen_size[0], max(x_a, x_b)), min(self.screen_size[1], max(y_a, y_b))
+        if x2 > x1 and y2 > y1:
+            return (int(x1), int(y1), int(x2 - x1), int(y2 - y1))
+        return None
 
     def _on_mouse_release(self, event):
         end_x = self.overlay.canvasx(event.x)
         end_y = self.overlay.canvasy(event.y)
 
         if self.start_x is not None and self.start_y is not None:
-            x1 = min(self.start_x, end_x)
-            y1 = min(self.start_y, end_y)
-            x2 = max(self.start_x, end_x)
-            y2 = max(self.start_y, end_y)
-            
-            if x2 > x1 and y2 > y1:
-                self.region = (int(x1), int(y1), int(x2 - x1), int(y2 - y1))
-        
-        self.root.quit()
-
-    def select_region(self):
-        self.root = tk.Tk()
-        self.root.attributes("-fullscreen", True)
-        self.root.attributes("-alpha", 0.3)
-        self.root.attributes("-topmost", True)
-        self.root.wait_visibility(self.root)
+            self.region = self._region_between(self.start_x, self.start_y, end_x, end_y)
 
-        self.overlay = tk.Canvas(self.root, cursor="cross", bg="gray10", highlightthickness=0)
-        self.overlay.pack(fill=tk.BOTH, expand=True)
+        self._finish()
 
-        self.overlay.bind("<ButtonPress-1>", self._on_mouse_press)
-        self.overlay.bind("<B1-Motion>", self._on_mouse_drag)
-        self.overlay.bind("<ButtonRelease-1>", self._on_mouse_release)
-        
-        self.root.after(100, self.root.lift)
-        self.root.mainloop()
-        
-        if self.root:
-            self.root.destroy()
-            self.root = None
-            self.overlay = None
-        
+    def _on_cancel(self, event=None):
+        self.region = None
+        self._finish()
+
+    def _show(self):
+        self.start_x = None
+        self.start_y = None
+        self.region = None
+        if self.rect:
+            self.overlay.delete(self.rect)
+            self.rect = None
+
+        self.root.deiconify()
+        self.root.lift()
+        self.root.focus_force()
+
+    def _finish(self):
+        self._cancel_pause_timer()
+        self._drag_end = None
+        if self.rect:
+            self.overlay.delete(self.rect)
+            self.rect = None
+        self.root.withdraw()
+        self.root.update_idletasks()
+        self.selection_done.set()
+
+    def _grab_background_frame(self, grayscale: bool):
+        frame = grab_region((0, 0) + self.screen_size, grayscale=grayscale)
+        if frame is None:
+            log_info("No background frame; speculative OCR disabled for this capture")
+            return None
+        return SpeculativeOCR(frame)
+
+    def select_region(self, grayscale: bool = False):
+        if not self.selection_done.is_set():
+            log_info("Region selection already in progress")
+            return None
+
+        self.selection_done.clear()
+        # Grabbed before the overlay is shown so the frame holds the unshaded screen.
+        self.speculative = self._grab_background_frame(grayscale) if config.get('speculative_ocr_enabled', False) else None
+        try:
+            self.parent_tk_root.after(0, self._show)
+        except (tk.TclError, RuntimeError) as e:
+            log_error(f"Failed to show selection overlay: {e}")
+            self.speculative = None
+            self.selection_done.set()
+            return None
+
+        self.selection_done.wait()
+        if self.speculative:
+            self.speculative.finish(self.region)
         return self.region
 
+    def take_frame_crop(self, region: tuple):
+        """Crop of the frame grabbed when the overlay opened (None without one); releases the frame."""
+        speculative, self.speculative = self.speculative, None
+        return speculative.crop(region) if speculative and region else None
 
-def capture_selected_region():
-    selector = ScreenRegionSelector()
-    region_coords = selector.select_region()
 
+_region_selector = None
+
+
+def init_region_selector(parent_tk_root) -> ScreenRegionSelector:
+    global _region_selector
+    _region_selector = ScreenRegionSelector(parent_tk_root)
+    return _region_selector
+
+
+def get_last_capture_region():
+    return _region_selector.region if _region_selector else None
+
+
+def capture_selected_region(grayscale: bool = False):
+    if _region_selector is None:
+        log_error("Region selector not initialized")
+        return None
+
+    region_coords = _region_selector.select_region(grayscale=grayscale)
+    frame_crop = _region_selector.take_frame_crop(region_coords)
+
+    if frame_crop is not None:
+        return frame_crop
     if region_coords:
-        try:
-            x, y, w, h = region_coords
-            bbox = (x, y, x + w, y + h)
-            screenshot = ImageGrab.grab(bbox=bbox, all_screens=True)
-            return screenshot
-        except Exception as e:
-            print(f"ImageGrab error: {e}")
-            try:
-                screenshot = pyautogui.screenshot(region=region_coords)
-                return screenshot
-            except Exception as e2:
-                print(f"pyautogui error: {e2}")
-                return None
+        return grab_region(region_coords, grayscale=grayscale)
     return None
 
 
 if __name__ == '__main__':
     print("Select a screen region...")
-    image = capture_selected_region()
+    tk_root = tk.Tk()
+    tk_root.withdraw()
+    init_region_selector(tk_root)
+    result = {}
+
+    def _capture():
+        result['image'] = capture_selected_region()
+        tk_root.after(0, tk_root.quit)
+
+    threading.Thread(target=_capture, daemon=True).start()
+    tk_root.mainloop()
+
+    image = result.get('image')
     if image:
         image.save("selected_screenshot.png")
         print("Screenshot saved")
         image.show()
     else:
-        print("Capture cancelled")
\ No newline at end of file
+        print("Capture cancelled")
@@ -0,0 +1,284 @@
+import base64
+import hashlib
+import io
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from PIL import Image
+
+from .config_manager import config
+from .ocr_engines import image_to_text
+from .ollama_integration import get_ai_response, warm_up_model
+from .utils import LRUCache, log_info, log_error, log_warning
+
+
+class ServiceBusy(Exception):
+    pass
+
+
+def decode_image(image_bytes: bytes) -> Image.Image:
+    """RGB image from encoded bytes; ValueError when they are not a readable image."""
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            return image.convert('RGB')
+    except (OSError, Image.DecompressionBombError, SyntaxError) as e:
+        raise ValueError(f"Cannot decode image: {e}")
+
+
+class PipelineJob:
+    def __init__(self, image_bytes: bytes | None = None, text: str | None = None, ocr_only: bool = False):
+        self.image_bytes = image_bytes
+        self.image = decode_image(image_bytes) if image_bytes is not None else None
+        self.text = text
+        self.ocr_only = ocr_only
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class PipelineService:
+    def __init__(self, workers: int = 2, queue_size: int = 16, cache_size: int = 256):
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.ocr_cache = LRUCache(cache_size)
+        self.answer_cache = LRUCache(cache_size)
+        self.workers = []
+        self.running = False
+        self.worker_count = max(1, workers)
+
+    def start(self):
+        self.running = True
+        for index in range(self.worker_count):
+            worker = threading.Thread(target=self._worker_loop, name=f"pipeline-worker-{index}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+        log_info(f"Pipeline service started with {self.worker_count} workers")
+
+    def stop(self):
+        self.running = False
+        for _ in self.workers:
+            try:
+                self.jobs.put_nowait(None)
+            except queue.Full:
+                break
+
+    def warm_up(self):
+        try:
+            image_to_text(Image.new('RGB', (64, 32), 'white'))
+        except RuntimeError as e:
+            log_error(f"OCR warm-up failed: {e}")
+        warm_up_model()
+
+    def submit(self, job: PipelineJob) -> PipelineJob:
+        try:
+            self.jobs.put_nowait(job)
+        except queue.Full:
+            raise ServiceBusy()
+        return job
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.worker_count,
+            "queued": self.jobs.qsize(),
+            "queue_size": self.jobs.maxsize,
+            "ocr_cache": self.ocr_cache.stats(),
+            "answer_cache": self.answer_cache.stats()
+        }
+
+    def _worker_loop(self):
+        while self.running:
+            job = self.jobs.get()
+            if job is None:
+                break
+            try:
+                job.result = self._process(job)
+            except Exception as e:
+                log_error(f"Pipeline job failed: {e}", exc_info=True)
+                job.error = str(e)
+            finally:
+                job.done.set()
+
+    def _process(self, job: PipelineJob) -> dict:
+        timings = {}
+        result = {"ocr_cached": False, "answer_cached": False}
+        text = job.text
+
+        if job.image_bytes is not None:
+            image_key = hashlib.sha1(job.image_bytes).hexdigest()
+            text = self.ocr_cache.get(image_key)
+            if text is None:
+                start = time.perf_counter()
+                text = image_to_text(job.image)
+                timings['ocr'] = round(time.perf_counter() - start, 3)
+                self.ocr_cache.put(image_key, text)
+            else:
+                result['ocr_cached'] = True
+            result['ocr_text'] = text
+
+        if not job.ocr_only:
+            answer = self.answer_cache.get(text)
+            if answer is None:
+                start = time.perf_counter()
+                answer = get_ai_response(text)
+                timings['model'] = round(time.perf_counter() - start, 3)
+                # Blank captures get a fixed notice that is not worth a cache slot.
+                if text and text.strip() and not answer.startswith("Error:"):
+                    self.answer_cache.put(text, answer)
+            else:
+                result['answer_cached'] = True
+            result['answer'] = answer
+
+        result['timings'] = timings
+        return result
+
+
+class PipelineRequestHandler(BaseHTTPRequestHandler):
+    service: PipelineService = None
+    request_timeout_s = 120
+    max_body_bytes = 20 * 1024 * 1024
+
+    def log_message(self, format, *args):
+        log_info(f"HTTP {self.address_string()} - {format % args}")
+
+    def _send_json(self, status: int, body: dict, headers: dict | None = None):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, {"status": "ok", **self.service.stats()})
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if self.path not in ('/answer', '/ocr'):
+            self._send_json(404, {"error": "Not found"})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            self._send_json(400, {"error": "Invalid Content-Length header"})
+            return
+        if length <= 0:
+            self._send_json(400, {"error": "Empty request body"})
+            return
+        if length > self.max_body_bytes:
+            self._send_json(413, {"error": "Request body too large"})
+            return
+
+        body = self.rfile.read(length)
+        try:
+            job = self._build_job(body)
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        try:
+            self.service.submit(job)
+        except ServiceBusy:
+            self._send_json(503, {"error": "Server busy, try again later"}, headers={'Retry-After': '1'})
+            return
+
+        if not job.done.wait(self.request_timeout_s):
+            self._send_json(504, {"error": "Processing timed out"})
+            return
+        if job.error:
+            self._send_json(500, {"error": job.error})
+            return
+        self._send_json(200, job.result)
+
+    def _build_job(self, body: bytes) -> PipelineJob:
+        ocr_only = self.path == '/ocr'
+        content_type = self.headers.get('Content-Type', '').split(';')[0].strip().lower()
+
+        if content_type.startswith('image/') or content_type == 'application/octet-stream':
+            return PipelineJob(image_bytes=body, ocr_only=ocr_only)
+
+        if content_type == 'application/json':
+            try:
+                payload = json.loads(body)
+            except json.JSONDecodeError:
+                raise ValueError("Invalid JSON body")
+            if not isinstance(payload, dict):
+                raise ValueError("JSON body must be an object")
+            if payload.get('image'):
+                try:
+                    image_bytes = base64.b64decode(payload['image'], validate=True)
+                except ValueError:
+                    raise ValueError("Field 'image' is not valid base64")
+                return PipelineJob(image_bytes=image_bytes, ocr_only=ocr_only)
+            if isinstance(payload.get('text'), str) and not ocr_only:
+                return PipelineJob(text=payload['text'])
+            raise ValueError("Provide 'image' (base64)" + ("" if ocr_only else " or 'text'"))
+
+        raise ValueError(f"Unsupported Content-Type: {content_type or 'missing'}")
+
+
+def create_server(service: PipelineService) -> ThreadingHTTPServer:
+    host = config.get('server_host', '127.0.0.1')
+    port = config.get('server_port', 8765)
+    handler = type('ConfiguredPipelineRequestHandler', (PipelineRequestHandler,), {
+        'service': service,
+        'request_timeout_s': config.get('server_request_timeout_s', 120)
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_background_server() -> ThreadingHTTPServer | None:
+    service = PipelineService(
+        workers=config.get('server_workers', 2),
+        queue_size=config.get('server_queue_size', 16),
+        cache_size=config.get('server_cache_size', 256)
+    )
+    try:
+        server = create_server(service)
+    except OSError as e:
+        log_error(f"Failed to start pipeline server: {e}")
+        return None
+
+    service.start()
+    threading.Thread(target=service.warm_up, name="pipeline-warmup", daemon=True).start()
+    threading.Thread(target=server.serve_forever, name="pipeline-http", daemon=True).start()
+    log_info(f"Pipeline server listening on http://{server.server_address[0]}:{server.server_address[1]}")
+    return server
+
+
+def main():
+    service = PipelineService(
+        workers=config.get('server_workers', 2),
+        queue_size=config.get('server_queue_size', 16),
+        cache_size=config.get('server_cache_size', 256)
+    )
+    server = create_server(service)
+    service.start()
+
+    print("Warming up OCR and model...")
+    service.warm_up()
+
+    host, port = server.server_address[:2]
+    print(f"QuizSnapper pipeline server running on http://{host}:{port}")
+    print("  POST /answer  (image body or JSON {\"text\": ...} / {\"image\": base64})")
+    print("  POST /ocr     (image body or JSON {\"image\": base64})")
+    print("  GET  /health")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        log_warning("Pipeline server interrupted")
+    finally:
+        server.server_close()
+        service.stop()
+        log_info("Pipeline server stopped")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,449 @@
+import argparse
+import csv
+import functools
+import json
+import os
+import queue
+import statistics
+import tempfile
+import threading
+import time
+import tracemalloc
+import tkinter as tk
+from pathlib import Path
+from types import SimpleNamespace
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from . import config_manager
+from . import main as app
+from .gui import SystemTrayApp
+from .mock_model_server import MockModelServer
+from .screenshot import init_region_selector
+from .utils import log_info, log_error, log_warning, is_tesseract_installed
+
+QUESTION_TEMPLATES = [
+    "Question 1 of 20\nWhich protocol guarantees in-order delivery?\nA) UDP\nB) TCP\nC) ICMP\nD) ARP",
+    "The capital of Italy is Rome.\nTrue\nFalse",
+    "1. Which layer of the OSI model handles routing?\n2. What does DNS stand for?",
+    "Select all prime numbers:\nA) 2\nB) 4\nC) 7\nD) 9",
+]
+STAGES = ("capture", "ocr", "ai", "total")
+DEFAULT_LIMITS = {
+    "rss_mb": 50.0,
+    "traced_mb": 20.0,
+    "threads": 2,
+    "tk_widgets": 0,
+    "tk_after": 2,
+    "latency_drift": 1.5,
+    "latency_floor_ms": 25.0,
+}
+
+
+@functools.lru_cache(maxsize=1)
+def _font(size: int = 24):
+    try:
+        return ImageFont.truetype("DejaVuSans.ttf", size)
+    except OSError:
+        try:
+            return ImageFont.load_default(size=size)
+        except TypeError:
+            return ImageFont.load_default()
+
+
+def render_question(iteration: int, width: int = 900, height: int = 360) -> Image.Image:
+    """A quiz screenshot; the iteration tag makes every capture unique so the OCR cache is not hit."""
+    image = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(image)
+    draw.multiline_text((24, 20), QUESTION_TEMPLATES[iteration % len(QUESTION_TEMPLATES)],
+                        fill='black', font=_font(), spacing=10)
+    draw.text((width - 110, height - 36), f"#{iteration}", fill='gray', font=_font())
+    return image
+
+
+class StubCapture:
+    """Replaces the screen grab with rendered questions.
+
+    When Tk is up the real selection overlay is still opened and dragged with synthetic
+    mouse events, so its widgets go through the same lifecycle as in the tray app.
+    """
+
+    def __init__(self, root=None, selector=None, size: tuple = (900, 360)):
+        self.root = root
+        self.selector = selector
+        self.size = size
+        self.iteration = 0
+        self.region = None
+
+    def _drag(self):
+        x, y = 100, 100
+        width, height = self.size
+        self.selector._on_mouse_press(SimpleNamespace(x=x, y=y))
+        self.selector._on_mouse_drag(SimpleNamespace(x=x + width // 2, y=y + height // 2))
+        self.selector._on_mouse_drag(SimpleNamespace(x=x + width, y=y + height))
+        self.selector._on_mouse_release(SimpleNamespace(x=x + width, y=y + height))
+
+    def capture(self, grayscale: bool = False):
+        if self.selector:
+            self.root.after(20, self._drag)
+            self.region = self.selector.select_region()
+            if self.region is None:
+                return None
+        else:
+            self.region = (100, 100) + tuple(self.size)
+
+        image = render_question(self.iteration, self.region[2], self.region[3])
+        self.iteration += 1
+        return np.asarray(image.convert('L')) if grayscale else image
+
+    def last_region(self):
+        return self.region
+
+
+class SoakTrayApp(SystemTrayApp):
+    """The tray app without the pystray icon; popups and the Tk root behave as usual."""
+
+    def _create_tray_icon(self):
+        return None
+
+
+def rss_mb() -> float | None:
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1024 / 1024
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _count_widgets(widget) -> int:
+    return 1 + sum(_count_widgets(child) for child in widget.winfo_children())
+
+
+def tk_counts(root, timeout: float = 5.0) -> tuple:
+    """(widgets, pending after callbacks), read on the Tk thread."""
+    if root is None:
+        return None, None
+    result = queue.Queue()
+    root.after(0, lambda: result.put((_count_widgets(root), len(root.tk.splitlist(root.tk.call('after', 'info'))))))
+    try:
+        return result.get(timeout=timeout)
+    except queue.Empty:
+        log_warning("Tk thread did not answer the widget count request")
+        return None, None
+
+
+class SoakMonitor:
+    def __init__(self, root=None):
+        self.root = root
+        self.samples = []
+        self.started = False
+        self.start_time = None
+        self.baseline_snapshot = None
+        self._latencies = {stage: [] for stage in STAGES}
+        self.ai_recorded = 0
+        self.answers = 0
+        self.error_answers = 0
+        self.workflow_errors = 0
+        self.unanswered = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        tracemalloc.start()
+        self.baseline_snapshot = tracemalloc.take_snapshot()
+        self.start_time = time.monotonic()
+        self.started = True
+
+    def record(self, stage: str, seconds: float):
+        if not self.started:
+            return
+        with self._lock:
+            self._latencies[stage].append(seconds * 1000)
+
+    def timed(self, stage: str, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - start)
+        return wrapper
+
+    def answering(self, func):
+        """Time an AI entry point and count its answers (a string or a list of them)."""
+        timed = self.timed('ai', func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            result = timed(*args, **kwargs)
+            answers = result if isinstance(result, list) else [result]
+            with self._lock:
+                if self.started:
+                    self.ai_recorded += 1
+                    self.answers += len(answers)
+                    self.error_answers += sum(1 for answer in answers
+                                              if not isinstance(answer, str) or answer.startswith("Error:"))
+            return result
+        return wrapper
+
+    def logging_errors(self, func):
+        """Count log_error calls from the workflow, which swallows its exceptions."""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if self.started:
+                with self._lock:
+                    self.workflow_errors += 1
+            return func(*args, **kwargs)
+        return wrapper
+
+    def sample(self, iteration: int) -> dict:
+        widgets, pending_after = tk_counts(self.root)
+        sample = {
+            "iteration": iteration,
+            "elapsed_s": round(time.monotonic() - self.start_time, 1),
+            "rss_mb": rss_mb(),
+            "traced_mb": tracemalloc.get_traced_memory()[0] / 1024 / 1024,
+            "threads": threading.active_count(),
+            "tk_widgets": widgets,
+            "tk_after": pending_after,
+        }
+        with self._lock:
+            for stage, values in self._latencies.items():
+                ordered = sorted(values)
+                sample[f"{stage}_p50_ms"] = ordered[len(ordered) // 2] if ordered else None
+                sample[f"{stage}_p95_ms"] = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] if ordered else None
+                values.clear()
+        self.samples.append(sample)
+        return sample
+
+    def top_growth(self, limit: int) -> list:
+        snapshot = tracemalloc.take_snapshot()
+        differences = snapshot.compare_to(self.baseline_snapshot, 'lineno')
+        return [difference for difference in differences if difference.size_diff > 0][:limit]
+
+    def stop(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def check_answers(monitor: SoakMonitor) -> list:
+    """Failures for iterations that did not produce a real answer."""
+    failures = []
+    if monitor.workflow_errors:
+        failures.append(f"{monitor.workflow_errors} errors logged by the capture workflow")
+    if monitor.error_answers:
+        failures.append(f"{monitor.error_answers} of {monitor.answers} answers were errors")
+    if monitor.unanswered:
+        failures.append(f"{monitor.unanswered} captures never reached the AI stage")
+    if not monitor.ai_recorded:
+        failures.append("the AI stage was never called")
+    return failures
+
+
+def evaluate(samples: list, limits: dict) -> list:
+    """Compare the median of the first and last quarter of the samples against the limits."""
+    if len(samples) < 2:
+        return []
+    quarter = max(1, len(samples) // 4)
+    first, last = samples[:quarter], samples[-quarter:]
+
+    def median(key: str, group: list):
+        values = [sample[key] for sample in group if sample.get(key) is not None]
+        return statistics.median(values) if values else None
+
+    failures = []
+    for key in ("rss_mb", "traced_mb", "threads", "tk_widgets", "tk_after"):
+        before, after = median(key, first), median(key, last)
+        if before is not None and after is not None and after - before > limits[key]:
+            failures.append(f"{key} grew from {before:.1f} to {after:.1f} (limit +{limits[key]})")
+
+    for stage in STAGES:
+        before, after = median(f"{stage}_p50_ms", first), median(f"{stage}_p50_ms", last)
+        if before is None or after is None:
+            continue
+        if after - before > limits['latency_floor_ms'] and after > before * limits['latency_drift']:
+            failures.append(f"{stage} p50 latency drifted from {before:.0f}ms to {after:.0f}ms "
+                            f"(limit x{limits['latency_drift']})")
+    return failures
+
+
+def _isolated_config(server_url: str, popup_enabled: bool) -> tuple:
+    """Point the app at the mock server through a temporary config.json."""
+    soak_config = config_manager.load_config()
+    soak_config.update({
+        "ai_provider": "ollama",
+        "ollama_api_url": f"{server_url}/api/generate",
+        "popup_enabled": popup_enabled,
+        "popup_auto_close_delay_ms": 50,
+        "auto_select_enabled": False,
+        "use_pdf_context": False,
+        "profile_next_runs": 0,
+    })
+    handle, path = tempfile.mkstemp(prefix='quizsnapper_soak_', suffix='.json')
+    with os.fdopen(handle, 'w') as f:
+        json.dump(soak_config, f, indent=2)
+
+    saved = (config_manager.CONFIG_FILE, dict(config_manager.config))
+    config_manager.CONFIG_FILE = Path(path)
+    config_manager.config.update(soak_config)
+    return saved, path
+
+
+def _restore_config(saved: tuple, path: str):
+    config_manager.CONFIG_FILE = saved[0]
+    config_manager.config.clear()
+    config_manager.config.update(saved[1])
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _print_sample(sample: dict):
+    def fmt(value, spec):
+        return format(value, spec) if value is not None else "n/a"
+
+    print(f"{sample['iteration']:>7} {sample['elapsed_s']:>8.1f} {fmt(sample['rss_mb'], '>8.1f')} "
+          f"{sample['traced_mb']:>8.2f} {sample['threads']:>7} {fmt(sample['tk_widgets'], '>7')} "
+          f"{fmt(sample['tk_after'], '>6')} {fmt(sample['ocr_p50_ms'], '>8.0f')} {fmt(sample['ai_p50_ms'], '>8.0f')} "
+          f"{fmt(sample['total_p50_ms'], '>9.0f')}")
+
+
+def _drive(tray, monitor: SoakMonitor, iterations: int, warmup: int, sample_every: int):
+    print(f"{'iter':>7} {'elapsed':>8} {'rss MB':>8} {'heap MB':>8} {'threads':>7} {'widgets':>7} "
+          f"{'after':>6} {'ocr p50':>8} {'ai p50':>8} {'total p50':>9}")
+    for iteration in range(warmup + iterations):
+        if iteration == warmup:
+            monitor.start()
+        ai_calls = monitor.ai_recorded
+        start = time.perf_counter()
+        app.process_screenshot_workflow(tray)
+        monitor.record('total', time.perf_counter() - start)
+        if monitor.started and monitor.ai_recorded == ai_calls:
+            monitor.unanswered += 1
+        done = iteration + 1 - warmup
+        if done > 0 and (done % sample_every == 0 or done == iterations):
+            _print_sample(monitor.sample(done))
+
+
+def run_soak(iterations: int, warmup: int = 20, sample_every: int = 100, model_latency_ms: float = 5,
+             csv_path: str | None = None, limits: dict | None = None, top: int = 10) -> bool:
+    limits = {**DEFAULT_LIMITS, **(limits or {})}
+    try:
+        tray = SoakTrayApp()
+    except tk.TclError as e:
+        log_warning(f"No display for Tk ({e}); soaking without popups or the selection overlay")
+        tray = None
+
+    root = tray.root if tray else None
+    selector = init_region_selector(root) if root else None
+    capture = StubCapture(root, selector)
+    monitor = SoakMonitor(root)
+    patched = {
+        "capture_selected_region": monitor.timed('capture', capture.capture),
+        "get_last_capture_region": capture.last_region,
+        "recognize": monitor.timed('ocr', app.recognize),
+        "get_ai_response": monitor.answering(app.get_ai_response),
+        "answer_questions": monitor.answering(app.answer_questions),
+        "log_error": monitor.logging_errors(app.log_error),
+    }
+    originals = {name: getattr(app, name) for name in patched}
+
+    # No request log: it would hold every prompt and show up as heap growth in this process.
+    with MockModelServer({"latency_ms": model_latency_ms}, request_log_size=0) as server:
+        saved, config_path = _isolated_config(server.url, popup_enabled=tray is not None)
+        for name, replacement in patched.items():
+            setattr(app, name, replacement)
+        log_info(f"Soak test: {iterations} iterations after {warmup} warm-up runs, mock model at {server.url}")
+        try:
+            if root:
+                error = []
+
+                def _worker():
+                    try:
+                        _drive(tray, monitor, iterations, warmup, sample_every)
+                    except Exception as e:
+                        error.append(e)
+                    finally:
+                        root.after(0, root.quit)
+
+                worker = threading.Thread(target=_worker, name="soak-driver", daemon=True)
+                worker.start()
+                root.mainloop()
+                worker.join()
+                if error:
+                    raise error[0]
+            else:
+                _drive(tray, monitor, iterations, warmup, sample_every)
+            growth = monitor.top_growth(top)
+        finally:
+            monitor.stop()
+            for name, original in originals.items():
+                setattr(app, name, original)
+            _restore_config(saved, config_path)
+            if root:
+                root.destroy()
+
+    if csv_path and monitor.samples:
+        with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=list(monitor.samples[0]))
+            writer.writeheader()
+            writer.writerows(monitor.samples)
+        print(f"\nSamples written to {csv_path}")
+
+    print(f"\nTop {top} allocation growth since warm-up:")
+    for difference in growth:
+        frame = difference.traceback[0]
+        print(f"  {difference.size_diff / 1024:>9.1f} KiB {difference.count_diff:>+7} blocks  "
+              f"{frame.filename}:{frame.lineno}")
+
+    failures = check_answers(monitor) + evaluate(monitor.samples, limits)
+    if failures:
+        print("\nSOAK FAILED:")
+        for failure in failures:
+            print(f"  - {failure}")
+        log_error(f"Soak test failed: {'; '.join(failures)}")
+        return False
+    print(f"\nSoak passed: no growth or drift over {iterations} iterations")
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the capture workflow repeatedly and fail on leaks or latency drift")
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--warmup', type=int, default=20, help="Runs before measuring starts (caches, model warm-up)")
+    parser.add_argument('--sample-every', type=int, default=100, help="Iterations between samples")
+    parser.add_argument('--model-latency-ms', type=float, default=5, help="Mock model delay per request")
+    parser.add_argument('--csv', help="Write the samples to this CSV file")
+    parser.add_argument('--top', type=int, default=10, help="Allocation sites to list")
+    parser.add_argument('--max-rss-growth-mb', type=float, default=DEFAULT_LIMITS['rss_mb'])
+    parser.add_argument('--max-heap-growth-mb', type=float, default=DEFAULT_LIMITS['traced_mb'])
+    parser.add_argument('--max-thread-growth', type=int, default=DEFAULT_LIMITS['threads'])
+    parser.add_argument('--max-widget-growth', type=int, default=DEFAULT_LIMITS['tk_widgets'])
+    parser.add_argument('--max-latency-drift', type=float, default=DEFAULT_LIMITS['latency_drift'],
+                        help="Allowed ratio of late to early p50 latency per stage")
+    args = parser.parse_args(argv)
+
+    if not is_tesseract_installed():
+        log_error("Tesseract is required for the soak test")
+        return 1
+
+    limits = {
+        "rss_mb": args.max_rss_growth_mb,
+        "traced_mb": args.max_heap_growth_mb,
+        "threads": args.max_thread_growth,
+        "tk_widgets": args.max_widget_growth,
+        "latency_drift": args.max_latency_drift,
+    }
+    passed = run_soak(args.iterations, args.warmup, max(1, args.sample_every), args.model_latency_ms,
+                      args.csv, limits, args.top)
+    return 0 if passed else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,111 @@
+import os
+import threading
+import time
+import numpy as np
+
+from .deadline import Deadline
+from .ocr_engines import recognize
+from .utils import log_info, log_warning
+
+MIN_REGION_SIZE = 24
+FINISH_WAIT_S = 30.0
+STALE_NICENESS = 19
+
+
+def _lower_thread_priority(thread_id: int):
+    # Niceness is per thread on Linux and inherited by the Tesseract processes it starts next.
+    try:
+        os.setpriority(os.PRIO_PROCESS, thread_id, STALE_NICENESS)
+    except (AttributeError, OSError):
+        pass
+
+
+class SpeculativeOCR:
+    """OCR of the selection while it is still being dragged.
+
+    Works on a frame grabbed when the overlay opened, so the crop at release is
+    pixel-identical to the one recognized during the drag and the final OCR is served
+    from the OCR result cache (or its auto-cropped text area when only the margins
+    changed). Only the latest paused rectangle is queued; older ones are dropped.
+    A pass over a rectangle other than the released one is stale: it is cut down to the
+    fast OCR pass and its thread is moved to the lowest CPU priority where supported.
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+        self._lock = threading.Lock()
+        self._running = None
+        self._pending = None
+        self._closed = False
+        self._final = None
+        self._deadline = None
+        self._thread_id = None
+        self._done = set()
+        self._idle = threading.Event()
+        self._idle.set()
+
+    def crop(self, region: tuple):
+        x, y, w, h = region
+        if isinstance(self.frame, np.ndarray):
+            return np.ascontiguousarray(self.frame[y:y + h, x:x + w])
+        return self.frame.crop((x, y, x + w, y + h))
+
+    def submit(self, region: tuple):
+        if region[2] < MIN_REGION_SIZE or region[3] < MIN_REGION_SIZE:
+            return
+        with self._lock:
+            if self._closed or region == self._running or region in self._done:
+                return
+            if self._running is not None:
+                self._pending = region
+                return
+            self._running = region
+            self._idle.clear()
+        threading.Thread(target=self._run, args=(region,), name="speculative-ocr", daemon=True).start()
+
+    def _run(self, region: tuple):
+        with self._lock:
+            self._thread_id = threading.get_native_id()
+        while region is not None:
+            with self._lock:
+                if self._closed and region != self._final:
+                    self._running = self._thread_id = None
+                    self._idle.set()
+                    return
+                # No time limit unless finish() finds this pass stale and expires it.
+                deadline = self._deadline = Deadline(float('inf'))
+            start = time.perf_counter()
+            try:
+                result = recognize(self.crop(region), region=region, deadline=deadline)
+                log_info(f"Speculative OCR of {region}: {len(result)} words in {time.perf_counter() - start:.2f}s")
+            except Exception as e:
+                log_warning(f"Speculative OCR failed: {e}")
+            with self._lock:
+                self._done.add(region)
+                region, self._pending = (None if self._closed else self._pending), None
+                self._running = region
+                if region is None:
+                    self._thread_id = None
+                    self._idle.set()
+
+    def finish(self, region: tuple | None):
+        """Drop queued rectangles; wait for an in-flight OCR of the final region so it is not run twice.
+
+        A stale in-flight pass cannot be stopped and may still overlap the final OCR.
+        """
+        with self._lock:
+            self._closed = True
+            self._final = region
+            self._pending = None
+            running, deadline, thread_id = self._running, self._deadline, self._thread_id
+        if running is None:
+            return
+        if region is not None and running == region:
+            log_info("Waiting for the speculative OCR of the final selection")
+            self._idle.wait(FINISH_WAIT_S)
+            return
+        log_info(f"Speculative OCR of {running} is stale, lowering its priority")
+        if deadline is not None:
+            deadline.budget_s = 0.0
+        if thread_id is not None:
+            _lower_thread_priority(thread_id)
@@ -0,0 +1,123 @@
+import math
+import re
+from .config_manager import config
+from .question_types import is_option
+from .utils import log_info
+
+DEFAULT_RULES = {
+    "whitespace": True,
+    "hyphenation": True,
+    "radio_glyphs": True,
+    "duplicate_lines": True,
+    "ui_chrome": True
+}
+
+# Single-word buttons are also plausible answers ("Continue", "Stop"), so they are kept inside the option block.
+UI_BUTTON_PATTERN = (r'(?:next|previous|prev|back|submit|skip|finish|continue|save|check|'
+                     r'avanti|indietro|successiva|precedente|invia|termina)')
+UI_CHROME_PATTERNS = [
+    r'(?:clear (?:my )?(?:choice|selection)|flag question|remove flag|mark for review|finish attempt)',
+    r'(?:question|domanda|frage|pregunta)\s*\d+\s*(?:of|/|di|von|de)\s*\d+',
+    r'(?:time (?:left|remaining)|tempo (?:rimasto|residuo))[:\s]*\d{1,2}:\d{2}(?::\d{2})?|\d{1,2}:\d{2}:\d{2}',
+    r'(?:not yet answered|answer saved|marked out of [\d.,]+|points? [\d.,]+|[\d.,]+ points?|'
+    r'risposta non ancora data|risposta salvata|punteggio max\.? [\d.,]+)',
+]
+
+_RADIO_GLYPH = re.compile(r'^(?:[○◯●◉□☐■☑☒©®]|\(\s?\)|\[\s?\])\s*')
+_LETTER_O_GLYPH = re.compile(r'^O\s+(?=\S)')
+_HYPHENATED_BREAK = re.compile(r'(\w)-[ \t]*\n[ \t]*([a-z])')
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for Latin-script text)."""
+    return math.ceil(len(text) / 4)
+
+
+def _chrome_pattern(patterns: list) -> re.Pattern:
+    return re.compile(r'^(?:' + '|'.join(f'(?:{pattern})' for pattern in patterns) + r')[\s.:!]*$', re.IGNORECASE)
+
+
+def _option_block(lines: list, chrome: re.Pattern) -> range:
+    """Line indexes of the answer options: the marked options, or else the lines right after the question."""
+    marked = [index for index, line in enumerate(lines) if is_option(line)]
+    if marked:
+        return range(marked[0], marked[-1] + 1)
+    stem_end = next((index for index, line in enumerate(lines) if line.rstrip().endswith(('?', ':'))), None)
+    if stem_end is None:
+        return range(0)
+    end = stem_end + 1
+    while end < len(lines) and lines[end].strip() and not chrome.match(lines[end].strip()):
+        end += 1
+    return range(stem_end + 1, end)
+
+
+def compact_ocr_text(text: str, rules: dict | None = None, extra_chrome_patterns: list | None = None) -> str:
+    rules = {**DEFAULT_RULES, **(rules or {})}
+    if extra_chrome_patterns is None:
+        extra_chrome_patterns = config.get('ocr_compaction_extra_chrome', [])
+
+    if rules['hyphenation']:
+        text = _HYPHENATED_BREAK.sub(r'\1\2', text)
+
+    lines = text.split('\n')
+    if rules['whitespace']:
+        lines = [re.sub(r'[ \t ]+', ' ', line).strip() for line in lines]
+
+    if rules['radio_glyphs']:
+        letter_o_options = sum(1 for line in lines if _LETTER_O_GLYPH.match(line)) >= 2
+        compacted = []
+        for line in lines:
+            stripped = _RADIO_GLYPH.sub('', line)
+            if letter_o_options:
+                stripped = _LETTER_O_GLYPH.sub('', stripped)
+            compacted.append(f"- {stripped}" if stripped != line and stripped else stripped)
+        lines = compacted
+
+    if rules['ui_chrome']:
+        chrome = _chrome_pattern(UI_CHROME_PATTERNS + list(extra_chrome_patterns))
+        button = _chrome_pattern([UI_BUTTON_PATTERN])
+        options = _option_block(lines, chrome)
+        lines = [line for index, line in enumerate(lines)
+                 if not chrome.match(line.strip()) and (index in options or not button.match(line.strip()))]
+
+    if rules['duplicate_lines']:
+        seen = set()
+        unique = []
+        for line in lines:
+            key = line.strip().lower()
+            if len(key.split()) >= 2 and key in seen:
+                continue
+            seen.add(key)
+            unique.append(line)
+        lines = unique
+
+    result = '\n'.join(lines)
+    if rules['whitespace']:
+        result = re.sub(r'\n{3,}', '\n\n', result).strip()
+    return result
+
+
+def compact_for_prompt(text: str) -> str:
+    if not config.get('ocr_compaction_enabled', True):
+        return text
+
+    compacted = compact_ocr_text(text, config.get('ocr_compaction_rules'))
+    log_info(f"OCR compaction: {len(text)} -> {len(compacted)} chars, "
+             f"~{estimate_tokens(text)} -> ~{estimate_tokens(compacted)} tokens")
+    return compacted
+
+
+if __name__ == '__main__':
+    sample = """Question 3 of 20
+Not yet answered
+Marked out of 1.00
+Which protocol  guaran-
+tees in-order delivery?
+○ UDP
+● TCP
+○ ICMP
+Time left 0:14:32
+Which protocol  guaran-
+tees in-order delivery?
+Next"""
+    print(compact_for_prompt(sample))
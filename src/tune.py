@@ -0,0 +1,214 @@
+import argparse
+import itertools
+import json
+import re
+import time
+from pathlib import Path
+from PIL import Image
+import requests
+
+from .batch import find_images
+from .config_manager import config, load_config, save_config
+from . import ocr
+from .ollama_integration import get_ai_response
+from .utils import log_info, log_error, log_warning
+
+PREPROCESSING_PROFILES = {
+    "fast": {"ocr_cascade": True, "ocr_min_confidence": 60, "ocr_max_escalated_line_ratio": 0.3,
+             "ocr_auto_crop": True, "ocr_adaptive_scaling": True},
+    "balanced": {"ocr_cascade": True, "ocr_min_confidence": 75, "ocr_max_escalated_line_ratio": 0.5,
+                 "ocr_auto_crop": True, "ocr_adaptive_scaling": True},
+    "heavy": {"ocr_cascade": False, "ocr_auto_crop": True, "ocr_adaptive_scaling": True},
+    "fixed_scale": {"ocr_cascade": True, "ocr_min_confidence": 75, "ocr_max_escalated_line_ratio": 0.5,
+                    "ocr_auto_crop": False, "ocr_adaptive_scaling": False},
+}
+DEFAULT_PSM_MODES = ["auto", 6, 3]
+
+
+def load_labels(input_dir: Path) -> dict:
+    """Expected answers per image, from labels.json ({"file": answer or [answers]}) or <image>.txt files."""
+    labels = {}
+    labels_file = input_dir / 'labels.json'
+    if labels_file.exists():
+        with open(labels_file, 'r', encoding='utf-8') as f:
+            for name, expected in json.load(f).items():
+                labels[name] = expected if isinstance(expected, list) else [expected]
+
+    for image_path in find_images(input_dir):
+        name = image_path.relative_to(input_dir).as_posix()
+        sidecar = image_path.with_suffix('.txt')
+        if name not in labels and sidecar.exists():
+            lines = sidecar.read_text(encoding='utf-8').splitlines()
+            labels[name] = [line.strip() for line in lines if line.strip()]
+    return labels
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r'\s+', ' ', re.sub(r'[^\w\s]', ' ', text.lower())).strip()
+
+
+def is_correct(answer: str, expected: list) -> bool:
+    normalized = _normalize(answer)
+    return bool(expected) and all(_normalize(item) in normalized for item in expected)
+
+
+def list_local_models() -> list:
+    api_url = config.get('ollama_api_url', 'http://localhost:11434/api/generate')
+    tags_url = api_url.replace("/api/generate", "/api/tags") if "/api/generate" in api_url else api_url + "/api/tags"
+    try:
+        response = requests.get(tags_url, timeout=5)
+        response.raise_for_status()
+        return [model['name'] for model in response.json().get('models', [])]
+    except requests.exceptions.RequestException as e:
+        log_warning(f"Could not list Ollama models: {e}")
+        return []
+
+
+def _run_ocr(image_paths: list, profile: dict, psm) -> tuple:
+    saved = {key: config.get(key) for key in list(profile) + ['ocr_psm']}
+    config.update(profile)
+    config['ocr_psm'] = psm
+    texts = {}
+    seconds = []
+    try:
+        for name, path in image_paths:
+            ocr.clear_result_cache()
+            with Image.open(path) as image:
+                image = image.convert('RGB')
+                start = time.perf_counter()
+                texts[name] = ocr.image_to_text(image)
+                seconds.append(time.perf_counter() - start)
+    finally:
+        config.update(saved)
+    return texts, seconds
+
+
+def _run_model(texts: dict, model: str) -> tuple:
+    """Answers through the app's own prompt path, with stored Q&A answers switched off so every one hits the model."""
+    saved = config.get('qa_fast_path_enabled', True)
+    config['qa_fast_path_enabled'] = False
+    answers = {}
+    seconds = []
+    try:
+        for name, text in texts.items():
+            start = time.perf_counter()
+            answers[name] = get_ai_response(text, model=model) if text else ""
+            seconds.append(time.perf_counter() - start)
+    finally:
+        config['qa_fast_path_enabled'] = saved
+    return answers, seconds
+
+
+def _mean(values: list) -> float:
+    return sum(values) / len(values) if values else 0.0
+
+
+def pareto_front(results: list) -> list:
+    """Results not beaten by another on both total latency and accuracy."""
+    front = []
+    for result in results:
+        dominated = any(
+            other['total_s'] <= result['total_s'] and other['accuracy'] >= result['accuracy']
+            and (other['total_s'] < result['total_s'] or other['accuracy'] > result['accuracy'])
+            for other in results
+        )
+        if not dominated:
+            front.append(result)
+    return sorted(front, key=lambda result: result['total_s'])
+
+
+def run_sweep(input_dir: Path, profiles: list, psm_modes: list, models: list) -> list:
+    labels = load_labels(input_dir)
+    image_paths = [(path.relative_to(input_dir).as_posix(), path) for path in find_images(input_dir)]
+    image_paths = [(name, path) for name, path in image_paths if name in labels]
+    if not image_paths:
+        log_error(f"No labelled images found in {input_dir}")
+        return []
+    log_info(f"Tuning over {len(image_paths)} labelled images: profiles {profiles}, psm {psm_modes}, models {models}")
+
+    results = []
+    for profile_name, psm in itertools.product(profiles, psm_modes):
+        texts, ocr_seconds = _run_ocr(image_paths, PREPROCESSING_PROFILES[profile_name], psm)
+        print(f"OCR {profile_name}/psm {psm}: {_mean(ocr_seconds):.2f}s per image")
+        for model in models:
+            answers, model_seconds = _run_model(texts, model)
+            correct = sum(1 for name, answer in answers.items() if is_correct(answer, labels[name]))
+            result = {
+                "profile": profile_name,
+                "psm": psm,
+                "model": model,
+                "ocr_s": _mean(ocr_seconds),
+                "model_s": _mean(model_seconds),
+                "total_s": _mean(ocr_seconds) + _mean(model_seconds),
+                "accuracy": correct / len(answers)
+            }
+            results.append(result)
+            print(f"  {model}: {result['model_s']:.2f}s per answer, accuracy {result['accuracy']:.0%}")
+    return results
+
+
+def print_results(results: list, front: list):
+    header = f"{'profile':<12} {'psm':<5} {'model':<24} {'ocr s':>7} {'model s':>8} {'total s':>8} {'accuracy':>9}"
+    print(f"\nAll configurations:\n{header}")
+    for result in sorted(results, key=lambda result: result['total_s']):
+        marker = " *" if result in front else ""
+        print(f"{result['profile']:<12} {str(result['psm']):<5} {result['model']:<24} {result['ocr_s']:>7.2f} "
+              f"{result['model_s']:>8.2f} {result['total_s']:>8.2f} {result['accuracy']:>9.0%}{marker}")
+    print("\n* Pareto front (no other configuration is both faster and more accurate)")
+
+
+def write_best(front: list, target_accuracy: float) -> dict | None:
+    candidates = [result for result in front if result['accuracy'] >= target_accuracy]
+    if not candidates:
+        print(f"No configuration reaches {target_accuracy:.0%} accuracy; config.json not changed")
+        return None
+
+    best = min(candidates, key=lambda result: result['total_s'])
+    current_config = load_config()
+    current_config.update(PREPROCESSING_PROFILES[best['profile']])
+    current_config['ocr_psm'] = best['psm']
+    current_config['ollama_model'] = best['model']
+    save_config(current_config)
+    print(f"Wrote {best['profile']} / psm {best['psm']} / {best['model']} to config.json "
+          f"({best['total_s']:.2f}s, {best['accuracy']:.0%})")
+    return best
+
+
+def _psm_value(value: str):
+    return value if value == 'auto' else int(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find the fastest OCR and model configuration for a labelled image set")
+    parser.add_argument('input_dir', help="Folder of question images with labels.json or <image>.txt answers")
+    parser.add_argument('--profiles', nargs='+', choices=sorted(PREPROCESSING_PROFILES),
+                        default=list(PREPROCESSING_PROFILES), help="Preprocessing profiles to try")
+    parser.add_argument('--psm', nargs='+', type=_psm_value, default=DEFAULT_PSM_MODES,
+                        help="Page segmentation modes to try ('auto' or a Tesseract PSM number)")
+    parser.add_argument('--models', nargs='+', help="Ollama models to try (default: all installed models)")
+    parser.add_argument('--target-accuracy', type=float, default=0.9, help="Accuracy required by --write (0-1)")
+    parser.add_argument('--write', action='store_true',
+                        help="Save the fastest configuration meeting --target-accuracy to config.json")
+    args = parser.parse_args(argv)
+
+    input_dir = Path(args.input_dir)
+    if not input_dir.is_dir():
+        parser.error(f"Input folder not found: {input_dir}")
+
+    models = args.models or list_local_models()
+    if not models:
+        parser.error("No models to try; pass --models or start Ollama")
+
+    results = run_sweep(input_dir, args.profiles, args.psm, models)
+    if not results:
+        return 1
+
+    front = pareto_front(results)
+    print_results(results, front)
+    if args.write:
+        write_best(front, args.target_accuracy)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
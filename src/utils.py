@@ -2,6 +2,8 @@ import subprocess
 import logging
 import requests
 import json
+import threading
+from collections import OrderedDict
 from .config_manager import config
 from pytesseract import TesseractNotFoundError
 
@@ -56,6 +58,44 @@ def log_warning(message):
     logging.warning(message)
     print(f"{Colors.YELLOW}[WARNING]{Colors.RESET} {message}")
 
+class LRUCache:
+    def __init__(self, max_size: int = 128):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._data), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
 def is_tesseract_installed():
     try:
         subprocess.run(['tesseract', '--version'], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
@@ -0,0 +1,3 @@
+@echo off
+echo Starting QuizSnapper v1.3.0 pipeline server...
+python -m src.server
\ No newline at end of file
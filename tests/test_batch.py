@@ -0,0 +1,30 @@
+import json
+
+from src.batch import compact_results, load_completed
+
+
+def _write(path, records):
+    path.write_text(''.join(json.dumps(record) + '\n' for record in records), encoding='utf-8')
+
+
+def test_last_record_for_a_file_wins(tmp_path):
+    output_file = tmp_path / 'results.jsonl'
+    _write(output_file, [
+        {"file": "a.png", "error": "Error: timeout"},
+        {"file": "b.png", "answer": "B"},
+        {"file": "a.png", "answer": "A"},
+        {"file": "b.png", "error": "OCR failed: broken"},
+    ])
+    assert load_completed(output_file) == {"a.png"}
+
+
+def test_resume_keeps_one_successful_record_per_file(tmp_path):
+    output_file = tmp_path / 'results.jsonl'
+    _write(output_file, [
+        {"file": "a.png", "error": "Error: timeout"},
+        {"file": "a.png", "answer": "A"},
+        {"file": "c.png", "error": "Error: timeout"},
+    ])
+    assert compact_results(output_file) == {"a.png"}
+    lines = output_file.read_text(encoding='utf-8').splitlines()
+    assert [json.loads(line) for line in lines] == [{"file": "a.png", "answer": "A"}]
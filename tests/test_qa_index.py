@@ -0,0 +1,21 @@
+from src.qa_index import QAIndex
+
+
+def _index(*pairs):
+    index = QAIndex()
+    for question, answer in pairs:
+        index.add(question, answer, 'test.csv')
+    return index
+
+
+def test_negated_question_does_not_match_stored_question():
+    index = _index(("Which of these animals is a mammal?", "Dog"))
+    assert index.lookup("Which of these animals is a mammal?", 0.9)['answer'] == "Dog"
+    assert index.lookup("Which of these animals is not a mammal?", 0.9) is None
+    assert index.lookup("Which of these animals is not a mammal?\nA) Dog\nB) Shark", 0.9) is None
+
+
+def test_stem_match_needs_stored_answer_among_options():
+    index = _index(("Which is the capital of France?", "Paris"))
+    assert index.lookup("Which is the capital of France?\nA) Paris\nB) Lyon", 0.9)['answer'] == "Paris"
+    assert index.lookup("Which is the capital of France?\nA) Berlin\nB) Lyon", 0.9) is None
@@ -0,0 +1,20 @@
+from src.question_types import answer_is_complete
+
+
+def test_single_choice_waits_past_lead_in():
+    assert not answer_is_complete("The correct answer is:\n", 'single_choice')
+    assert not answer_is_complete("The correct answer is:\nB) Par", 'single_choice')
+    assert answer_is_complete("The correct answer is:\nB) Paris\n", 'single_choice')
+
+
+def test_multi_select_waits_past_lead_in():
+    assert not answer_is_complete("The correct answers are:\n\n", 'multi_select')
+    assert not answer_is_complete("The correct answers are:\n\n- Paris\n- Ro", 'multi_select')
+    assert answer_is_complete("The correct answers are:\n\n- Paris\n- Rome\n\n", 'multi_select')
+
+
+def test_match_keeps_pairs_separated_by_blank_lines():
+    text = "A -> x\n\nB -> y\n\nC -> z\n\n"
+    assert not answer_is_complete(text, 'match')
+    assert not answer_is_complete("Matches:\n\n" + text, 'match')
+    assert answer_is_complete(text + "D -> w\nThese are all the pairs.\n", 'match')